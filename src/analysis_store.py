@@ -0,0 +1,67 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Iterable, List, Optional
+
+from file_utils import atomic_write_file
+
+logger = logging.getLogger(__name__)
+
+IGNORED_DIRS = {".venv", "venv", "__pycache__", ".pytest_cache", ".git", ".mypy_cache", ".ruff_cache"}
+
+
+def python_sources(cwd: str) -> List[str]:
+    sources = []
+    for root, dirs, files in os.walk(cwd):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+        for name in sorted(files):
+            if name.endswith(".py"):
+                sources.append(os.path.relpath(os.path.join(root, name), cwd))
+    return sources
+
+
+class AnalysisStore:
+    """Tool results keyed by a hash of the files they were computed from.
+
+    Keys use paths relative to the project, so a scratch copy with identical content
+    gets the same fingerprint as the project itself.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable analysis store {path}: {e}")
+
+    @staticmethod
+    def fingerprint(cwd: str, file_paths: Iterable[str]) -> str:
+        digest = hashlib.sha256()
+        for file_path in sorted(file_paths):
+            digest.update(file_path.replace(os.sep, "/").encode("utf-8") + b"\0")
+            try:
+                with open(os.path.join(cwd, file_path), "rb") as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+            except OSError:
+                digest.update(b"<missing>")
+        return digest.hexdigest()
+
+    def get(self, tool: str, fingerprint: str) -> Optional[list]:
+        result = self.entries.get(f"{tool}:{fingerprint}")
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def put(self, tool: str, fingerprint: str, result) -> None:
+        # Modules are checked from several threads at once
+        with self._lock:
+            self.entries[f"{tool}:{fingerprint}"] = list(result)
+            if self.path:
+                atomic_write_file(self.path, json.dumps(self.entries))
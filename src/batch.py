@@ -0,0 +1,158 @@
+import os
+import re
+import json
+import time
+import shutil
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import click
+
+from coder_ai_agent import CoderAIAgent
+from llm_cache import CachedLLM
+from export import export_options, export_project
+
+_llm_semaphore = None
+
+
+class BoundedLLM:
+    """Caps the number of in-flight generations shared by every worker process."""
+
+    def __init__(self, llm, semaphore):
+        self.llm = llm
+        self.semaphore = semaphore
+
+    def generate(self, prompt: str, **options) -> str:
+        with self.semaphore:
+            return self.llm.generate(prompt, **options)
+
+    def stream(self, prompt: str, **options):
+        with self.semaphore:
+            yield from self.llm.stream(prompt, **options)
+
+    async def agenerate(self, prompt: str, **options) -> str:
+        await asyncio.to_thread(self.semaphore.acquire)
+        try:
+            return await self.llm.agenerate(prompt, **options)
+        finally:
+            self.semaphore.release()
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def load_tasks(tasks_file: str) -> list:
+    tasks = []
+    with open(tasks_file, 'r') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            spec = json.loads(line)
+            task_id = str(spec.get("task_id") or spec.get("request_id") or spec.get("id") or line_number)
+            task = spec.get("task") or "\n\n".join(filter(None, [spec.get("title"), spec.get("body")]))
+            tasks.append((task_id, task))
+    return tasks
+
+
+def project_name_for(index: int, task_id: str, run_id: str) -> str:
+    # The run id keeps a re-run from colliding with the projects an earlier batch left behind
+    slug = re.sub(r"[^A-Za-z0-9_]+", "_", task_id).strip("_")[:40]
+    return f"project_{index:04d}_{slug}_{run_id}"
+
+
+def completed_task_ids(output: str) -> set:
+    completed = set()
+    if not os.path.exists(output):
+        return completed
+    with open(output, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "completed":
+                completed.add(record.get("task_id"))
+    return completed
+
+
+def _init_worker(semaphore, work_dir: str) -> None:
+    global _llm_semaphore
+    _llm_semaphore = semaphore
+    os.chdir(work_dir)
+
+
+def bound_llm(agent: CoderAIAgent) -> None:
+    # Bound only real provider calls; cache hits should never wait for a slot
+    for key, client in agent.llm.clients.items():
+        if isinstance(client, CachedLLM):
+            client.llm = BoundedLLM(client.llm, _llm_semaphore)
+        else:
+            agent.llm.clients[key] = BoundedLLM(client, _llm_semaphore)
+
+
+def run_one(index: int, task_id: str, task: str, run_id: str, zip_dir: str = None) -> dict:
+    start = time.perf_counter()
+    record = {"task_id": task_id, "task": task}
+    try:
+        agent = CoderAIAgent(task=task, project_name=project_name_for(index, task_id, run_id))
+        bound_llm(agent)
+        record["project_dir"] = agent.pwd
+        agent.run_task()
+        tests_passed, coverage, _ = agent.run_tests()
+        record.update(agent.results, tests_passed=tests_passed, coverage=coverage, status="completed")
+
+        if zip_dir:
+            zip_path = os.path.join(zip_dir, f"{agent.project_name}.{agent.config.get('export_format', 'zip')}")
+            report = export_project(agent.pwd, zip_path, **export_options(agent.config))
+            shutil.rmtree(agent.pwd)
+            record.update(zip_path=zip_path, export_bytes=report.archive_bytes, export_time=round(report.seconds, 3))
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["wall_time"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+@click.command()
+@click.argument("tasks_file", type=click.Path(exists=True))
+@click.option("--output", default="batch_results.jsonl", type=click.Path(), help="JSONL file for per-task results")
+@click.option("--workers", default=os.cpu_count(), type=int, help="Number of concurrent agent pipelines")
+@click.option("--llm-concurrency", default=2, type=int, help="Maximum in-flight LLM generations across workers")
+@click.option("--work-dir", default=".", type=click.Path(), help="Directory where projects are created")
+@click.option("--zip-dir", type=click.Path(), help="Archive each finished project into this directory and delete it")
+def batch(tasks_file: str, output: str, workers: int, llm_concurrency: int, work_dir: str, zip_dir: str = None):
+    """
+    Run many Nemo Agent tasks from a JSONL file through a pool of worker processes.
+    Each line needs a "task" (or "title"/"body") and may carry a "task_id".
+    """
+    tasks = load_tasks(tasks_file)
+    done = completed_task_ids(output)
+    if done:
+        print(f"Skipping {len(done & {task_id for task_id, _ in tasks})} tasks already completed in {output}")
+    run_id = time.strftime("%Y%m%d%H%M%S")
+    work_dir = os.path.abspath(work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    if zip_dir:
+        zip_dir = os.path.abspath(zip_dir)
+        os.makedirs(zip_dir, exist_ok=True)
+
+    context = multiprocessing.get_context()
+    semaphore = context.BoundedSemaphore(llm_concurrency)
+    completed = 0
+    with open(output, "a") as results, ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker,
+            initargs=(semaphore, work_dir)) as executor:
+        futures = [executor.submit(run_one, index, task_id, task, run_id, zip_dir)
+                   for index, (task_id, task) in enumerate(tasks) if task_id not in done]
+        for future in as_completed(futures):
+            record = future.result()
+            results.write(json.dumps(record) + "\n")
+            results.flush()
+            completed += 1
+            print(f"[{completed}/{len(futures)}] {record['task_id']}: {record['status']} in {record['wall_time']}s")
+
+    print(f"Batch finished. Results are in: {os.path.abspath(output)}")
+
+
+if __name__ == "__main__":
+    batch()
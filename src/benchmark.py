@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import tempfile
+from contextlib import contextmanager
+
+import click
+
+from coder_ai_agent import CoderAIAgent
+from mock_llm_server import MockLLMServer, ResponseBook
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+# Every task must run from scratch, so nothing may answer from the response cache or an old checkpoint
+BENCHMARK_CONFIG = {
+    "llm_cache_enabled": False,
+    "speculative_candidates": 1,
+    # The response books hold single-file answers, not module plans
+    "module_planning": False,
+    "trace_dir": None,
+    "checkpoint_dir": None,
+}
+
+
+@contextmanager
+def environment(**variables):
+    saved = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def load_suite(suite_file: str) -> list:
+    with open(suite_file, "r") as f:
+        tasks = json.load(f)["tasks"]
+    suite_dir = os.path.dirname(os.path.abspath(suite_file))
+    for task in tasks:
+        task["responses"] = os.path.join(suite_dir, task["responses"])
+    return tasks
+
+
+def run_benchmark_task(spec: dict, token_rate: float = None) -> dict:
+    book = ResponseBook.load(spec["responses"])
+    record = {"task_id": spec["task_id"]}
+    start = time.perf_counter()
+    with MockLLMServer(book, token_rate) as server, \
+            environment(GROQ_BASE_URL=server.url, GROQ_API_KEY="benchmark"):
+        try:
+            agent = CoderAIAgent(
+                task=spec["task"],
+                project_name=f"bench_{spec['task_id']}",
+                config_overrides=dict(BENCHMARK_CONFIG, ollama_api_url=f"{server.url}/api"),
+            )
+            agent.run_task()
+            tests_passed, coverage, _ = agent.run_tests()
+            config = agent.config
+            record.update(
+                status="completed",
+                implemented=agent.results.get("implemented"),
+                pylint_score=agent.results.get("pylint_score"),
+                complexipy_score=agent.results.get("complexipy_score"),
+                improvement_attempts=agent.results.get("improvement_attempts"),
+                tests_passed=tests_passed,
+                coverage=coverage,
+                thresholds_met=bool(
+                    tests_passed
+                    and (agent.results.get("pylint_score") or 0) >= config["pylint_threshold"]
+                    and (agent.results.get("complexipy_score") or 0) <= config["complexipy_threshold"]
+                    and coverage >= config["coverage_threshold"]
+                ),
+                stages={name: round(stage["total"], 3) for name, stage in agent.tracer.summary().items()},
+            )
+        except Exception as e:
+            record.update(status="error", error=str(e))
+    record["llm_requests"] = book.request_count
+    record["wall_time"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float) -> list:
+    """Return a description of every task or stage that got slower than ``tolerance`` allows."""
+    previous = {task["task_id"]: task for task in baseline["tasks"]}
+    regressions = []
+    for task in current["tasks"]:
+        before = previous.get(task["task_id"])
+        if before is None:
+            continue
+        timings = [("wall_time", task["wall_time"], before["wall_time"])]
+        timings += [(stage, seconds, before.get("stages", {}).get(stage))
+                    for stage, seconds in task.get("stages", {}).items()]
+        for name, now, then in timings:
+            # Ignore sub-100ms stages, whose jitter would swamp any relative tolerance
+            if then and now > then * (1 + tolerance) and now - then > 0.1:
+                regressions.append(f"{task['task_id']} {name}: {then:.2f}s -> {now:.2f}s")
+        if before.get("thresholds_met") and not task.get("thresholds_met"):
+            regressions.append(f"{task['task_id']}: no longer reaches the quality thresholds")
+        if (task.get("improvement_attempts") or 0) > (before.get("improvement_attempts") or 0):
+            regressions.append(f"{task['task_id']} improvement attempts: "
+                               f"{before.get('improvement_attempts')} -> {task.get('improvement_attempts')}")
+    return regressions
+
+
+@click.command()
+@click.option("--suite", "suite_file", default=os.path.join(BENCHMARK_DIR, "suite.json"),
+              type=click.Path(exists=True), help="Benchmark suite definition")
+@click.option("--token-rate", type=float, help="Tokens per second the mock server replays at; unthrottled if omitted")
+@click.option("--label", default=None, help="Name for this result set (defaults to a timestamp)")
+@click.option("--output-dir", default=os.path.join(BENCHMARK_DIR, "results"), type=click.Path(),
+              help="Directory where result sets are stored")
+@click.option("--baseline", type=click.Path(exists=True), help="Earlier result set to compare against")
+@click.option("--tolerance", default=0.2, type=float, help="Allowed relative slowdown before flagging a regression")
+@click.option("--fail-on-regression", is_flag=True, help="Exit with status 1 if a regression is found")
+def benchmark(suite_file: str, token_rate: float, label: str, output_dir: str, baseline: str,
+              tolerance: float, fail_on_regression: bool):
+    """
+    Run the fixed benchmark tasks against a local mock LLM server and record the timings.
+    No Groq or Ollama access is needed; uv and the dev tools still run for real.
+    """
+    label = label or time.strftime("%Y%m%d-%H%M%S")
+    tasks = load_suite(suite_file)
+    results = {"label": label, "created": time.time(), "token_rate": token_rate, "tasks": []}
+
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="nemo_bench_") as work_dir:
+        os.chdir(work_dir)
+        try:
+            for spec in tasks:
+                record = run_benchmark_task(spec, token_rate)
+                results["tasks"].append(record)
+                print(f"{record['task_id']}: {record['status']} in {record['wall_time']}s, "
+                      f"{record['llm_requests']} LLM requests, thresholds met: {record.get('thresholds_met')}")
+        finally:
+            os.chdir(original_dir)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output = os.path.join(output_dir, f"{label}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark results written to {output}")
+
+    if baseline:
+        with open(baseline, "r") as f:
+            regressions = compare_results(results, json.load(f), tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if not regressions:
+            print(f"No regressions against {baseline}")
+        if regressions and fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,73 @@
+import os
+import json
+import time
+import logging
+
+from file_utils import atomic_write_file
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointError(Exception):
+    pass
+
+
+class RunJournal:
+    """Progress of one agent run, rewritten atomically after every completed stage.
+
+    ``stages`` lists the stages that finished; ``state`` holds whatever the agent needs to
+    continue from there (results so far, improvement attempt counter, previous suggestions).
+    """
+
+    def __init__(self, path: str, task: str, project_name: str, project_dir: str):
+        self.path = path
+        self.data = {
+            "task": task,
+            "project_name": project_name,
+            "project_dir": project_dir,
+            "created": time.time(),
+            "updated": None,
+            "stages": [],
+            "state": {},
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "RunJournal":
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CheckpointError(f"Cannot read run checkpoint {path}: {e}") from e
+        journal = cls(path, data["task"], data["project_name"], data["project_dir"])
+        journal.data.update(data)
+        return journal
+
+    @property
+    def task(self) -> str:
+        return self.data["task"]
+
+    @property
+    def project_name(self) -> str:
+        return self.data["project_name"]
+
+    @property
+    def project_dir(self) -> str:
+        return self.data["project_dir"]
+
+    @property
+    def state(self) -> dict:
+        return self.data["state"]
+
+    def completed(self, stage: str) -> bool:
+        return stage in self.data["stages"]
+
+    def record(self, stage: str = None, **state) -> None:
+        if stage and stage not in self.data["stages"]:
+            self.data["stages"].append(stage)
+        self.data["state"].update(state)
+        self.save()
+
+    def save(self) -> None:
+        self.data["updated"] = time.time()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        atomic_write_file(self.path, json.dumps(self.data, indent=2))
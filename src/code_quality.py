@@ -1,13 +1,148 @@
 import re
+import json
+import time
+import logging
+import threading
 import subprocess
-from typing import Tuple
-from constants import AUTOPEP8_CMD, PYLINT_CMD, COMPLEXIPY_CMD, PYLINT_SCORE_PATTERN, COMPLEXIPY_SCORE_PATTERN
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import List, Optional, Tuple
+from constants import (
+    AUTOPEP8_CMD, PYLINT_CMD, COMPLEXIPY_CMD, PYLINT_SCORE_PATTERN, COMPLEXIPY_SCORE_PATTERN,
+    AUTOPEP8_ARGS, PYLINT_ARGS, LINT_WORKER_CMD
+)
+from tracing import Tracer
 
+logger = logging.getLogger(__name__)
 
-def run_autopep8(file_path: str, cwd: str) -> None:
+
+@dataclass
+class PylintMessage:
+    path: str
+    line: int
+    column: int
+    msg_id: str
+    symbol: str
+    message: str
+
+    def format(self) -> str:
+        return f"{self.path}:{self.line}:{self.column}: {self.msg_id}: {self.message} ({self.symbol})"
+
+
+@dataclass
+class PylintReport:
+    score: float
+    messages: List[PylintMessage] = field(default_factory=list)
+
+    def format(self, file_path: str) -> str:
+        module = file_path[:-3] if file_path.endswith(".py") else file_path
+        lines = [f"************* Module {module}"] + [message.format() for message in self.messages]
+        lines.append(f"Your code has been rated at {self.score:.2f}/10")
+        return "\n".join(lines)
+
+
+@dataclass
+class FunctionComplexity:
+    name: str
+    complexity: int
+    line_start: Optional[int] = None
+    line_end: Optional[int] = None
+
+
+@dataclass
+class ComplexipyReport:
+    path: str
+    score: int
+    functions: List[FunctionComplexity] = field(default_factory=list)
+
+    def format(self) -> str:
+        lines = [f"{self.path} {function.name} {function.complexity}" for function in self.functions]
+        lines.append(f"🧠 Total Cognitive Complexity in {self.path}: {self.score}")
+        return "\n".join(lines)
+
+
+class QualityWorkerError(Exception):
+    pass
+
+
+class QualityWorker:
+    """Client for lint_worker.py running persistently inside a project's virtual environment."""
+
+    def __init__(self, cwd: str, timeout: float = None):
+        self.cwd = cwd
+        self.timeout = timeout
+        self.process = None
+        self._lock = threading.Lock()
+        self._request_id = 0
+        self._start()
+
+    def _start(self) -> None:
+        self.process = subprocess.Popen(
+            LINT_WORKER_CMD, cwd=self.cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, bufsize=1
+        )
+
+    def _request(self, tool: str, file_path: str, args: list, timeout: float = None) -> dict:
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self.process.poll() is not None:
+                logger.warning("Quality worker exited; restarting it.")
+                self._start()
+
+            self._request_id += 1
+            request = {"id": self._request_id, "tool": tool, "path": file_path, "args": args}
+            # A hung tool would block readline forever, so the timer kills the worker instead
+            timer = threading.Timer(timeout, self.process.kill) if timeout is not None else None
+            try:
+                if timer:
+                    timer.start()
+                self.process.stdin.write(json.dumps(request) + "\n")
+                self.process.stdin.flush()
+                line = self.process.stdout.readline()
+            except OSError as e:
+                raise QualityWorkerError(f"{tool} request failed: {e}") from e
+            finally:
+                if timer:
+                    timer.cancel()
+
+        if not line:
+            raise QualityWorkerError(f"Quality worker died while running {tool}")
+        try:
+            response = json.loads(line)
+        except ValueError as e:
+            raise QualityWorkerError(f"Unreadable response from quality worker for {tool}: {line[:200]!r}") from e
+        if not response.get("ok"):
+            raise QualityWorkerError(f"{tool} failed in worker:\n{response.get('error')}")
+        return response["result"]
+
+    def autopep8(self, file_path: str, timeout: float = None) -> None:
+        self._request("autopep8", file_path, AUTOPEP8_ARGS, timeout)
+
+    def pylint(self, file_path: str, timeout: float = None) -> PylintReport:
+        result = self._request("pylint", file_path, PYLINT_ARGS, timeout)
+        return PylintReport(result["score"], [PylintMessage(**message) for message in result["messages"]])
+
+    def complexipy(self, file_path: str, timeout: float = None) -> ComplexipyReport:
+        result = self._request("complexipy", file_path, [], timeout)
+        return ComplexipyReport(result["path"], result["score"],
+                                [FunctionComplexity(**function) for function in result["functions"]])
+
+    def close(self) -> None:
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+
+def run_autopep8(file_path: str, cwd: str, timeout: float = None) -> None:
     cmd = AUTOPEP8_CMD + [file_path]
     try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=cwd)
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=cwd, timeout=timeout)
         print(result.stdout)
     except subprocess.CalledProcessError as e:
         print(f"Error occurred: {e}")
@@ -15,20 +150,30 @@ def run_autopep8(file_path: str, cwd: str) -> None:
         print(f"Return code: {e.returncode}")
         print(f"Output: {e.output}")
         print(f"Error: {e.stderr}")
+    except subprocess.TimeoutExpired:
+        logger.warning(f"autopep8 timed out after {timeout}s on {file_path}")
 
 
-def run_pylint(file_path: str, cwd: str) -> Tuple[float, str]:
+def run_pylint(file_path: str, cwd: str, timeout: float = None) -> Tuple[float, str]:
     cmd = PYLINT_CMD + [file_path]
-    result = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"pylint timed out after {timeout}s on {file_path}")
+        return 0.0, f"pylint timed out after {timeout}s"
     pylint_output = result.stdout + result.stderr
     score_match = re.search(PYLINT_SCORE_PATTERN, pylint_output)
     pylint_score = float(score_match.group(1)) if score_match else 0.0
     return pylint_score, pylint_output
 
 
-def run_complexipy(file_path: str, cwd: str) -> Tuple[int, str]:
+def run_complexipy(file_path: str, cwd: str, timeout: float = None) -> Tuple[int, str]:
     cmd = COMPLEXIPY_CMD + [file_path]
-    result = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"complexipy timed out after {timeout}s on {file_path}")
+        return None, f"complexipy timed out after {timeout}s"
     complexipy_output = result.stdout + result.stderr
     escaped_path = re.escape(file_path)
     score_match = re.search(COMPLEXIPY_SCORE_PATTERN.format(escaped_path=escaped_path), complexipy_output, re.DOTALL)
@@ -36,8 +181,58 @@ def run_complexipy(file_path: str, cwd: str) -> Tuple[int, str]:
     return complexipy_score, complexipy_output
 
 
-def check_code_quality(file_path: str, cwd: str) -> Tuple[float, int, str, str]:
-    run_autopep8(file_path, cwd)
-    pylint_score, pylint_output = run_pylint(file_path, cwd)
-    complexipy_score, complexipy_output = run_complexipy(file_path, cwd)
-    return pylint_score, complexipy_score, pylint_output, complexipy_output
\ No newline at end of file
+def analysis_succeeded(pylint_score: float, complexipy_score: int, pylint_output: str, complexipy_output: str) -> bool:
+    # A timed-out or crashed pylint prints no rating and complexipy reports no score
+    return complexipy_score is not None and re.search(PYLINT_SCORE_PATTERN, pylint_output) is not None
+
+
+def _timed(tool: str, timings: dict, tracer: Optional[Tracer], func, *args):
+    start = time.perf_counter()
+    try:
+        with tracer.span(f"quality.{tool}") if tracer is not None else nullcontext():
+            return func(*args)
+    finally:
+        timings[tool] = time.perf_counter() - start
+
+
+def _check_with_worker(file_path: str, worker: QualityWorker, timings: dict, tracer: Optional[Tracer],
+                       remaining) -> Tuple[float, int, str, str]:
+    _timed("autopep8", timings, tracer, worker.autopep8, file_path, remaining())
+    pylint_report = _timed("pylint", timings, tracer, worker.pylint, file_path, remaining())
+    complexipy_report = _timed("complexipy", timings, tracer, worker.complexipy, file_path, remaining())
+    return pylint_report.score, complexipy_report.score, pylint_report.format(file_path), complexipy_report.format()
+
+
+def check_code_quality(file_path: str, cwd: str, timeout: float = None,
+                       worker: QualityWorker = None, tracer: Tracer = None) -> Tuple[float, int, str, str]:
+    timings = {}
+    # The timeout covers the whole check, so a worker that fails late does not buy the fallback a fresh budget
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def remaining():
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+    if worker is not None:
+        try:
+            result = _check_with_worker(file_path, worker, timings, tracer, remaining)
+            logger.info("Quality worker timings for %s: %s", file_path,
+                        ", ".join(f"{tool}={seconds:.2f}s" for tool, seconds in timings.items()))
+            return result
+        except QualityWorkerError as e:
+            logger.warning(f"Quality worker failed, falling back to subprocesses: {e}")
+            timings = {}
+
+    _timed("autopep8", timings, tracer, run_autopep8, file_path, cwd, remaining())
+
+    # pylint and complexipy only read the formatted file, so they can run side by side
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        tool_timeout = remaining()
+        pylint_future = executor.submit(_timed, "pylint", timings, tracer, run_pylint, file_path, cwd, tool_timeout)
+        complexipy_future = executor.submit(_timed, "complexipy", timings, tracer, run_complexipy, file_path, cwd,
+                                            tool_timeout)
+        pylint_score, pylint_output = pylint_future.result()
+        complexipy_score, complexipy_output = complexipy_future.result()
+
+    logger.info("Quality tool timings for %s: %s", file_path,
+                ", ".join(f"{tool}={seconds:.2f}s" for tool, seconds in timings.items()))
+    return pylint_score, complexipy_score, pylint_output, complexipy_output
@@ -3,16 +3,36 @@ import json
 import random
 import logging
 import re
+import shutil
+import asyncio
+import time
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
-from ollama_api import OllamaAPI
-from file_utils import robust_write_file, extract_file_contents, validate_file_content
-from code_quality import check_code_quality
+from file_utils import (
+    robust_write_file, write_files_atomically, extract_file_contents, resolve_file_changes, validate_file_content, StreamingFileParser, StreamValidator,
+    StreamValidationError
+)
+from code_quality import check_code_quality, analysis_succeeded, run_pylint, QualityWorker
 from constants import (
-    CONFIG_PATH, COVERAGERC_CONTENT, PYTEST_CMD, COVERAGE_PATTERN,
-    IMPROVEMENT_PROMPT, TEST_IMPROVEMENT_PROMPT, VALIDATION_PROMPT
+    CONFIG_PATH, COVERAGERC_CONTENT, COVERAGE_PATTERN, DEV_DEPENDENCIES, TESTS_INIT_CONTENT,
+    IMPROVEMENT_PROMPT, TEST_IMPROVEMENT_PROMPT, VALIDATION_PROMPT, FULL_FILE_FORMAT, PATCH_FORMAT,
+    CURRENT_CODE_SECTION, PLANNING_PROMPT, MODULE_PROMPT, ENTRY_POINT_RULE
 )
-from groq_api import GroqAPI
+from llm_cache import ResponseCache, CachedLLM
+from llm_client import LLMError
+from llm_router import LLMRouter
+from project_template import ProjectTemplatePool
+from analysis_store import AnalysisStore, python_sources
+from test_runner import build_pytest_command, prepare_report_dir, read_test_reports
+from prompt_compaction import compact_quality_outputs, count_tokens
+from dependencies import parse_uv_add_commands, missing_dependencies, install_dependencies
+from tracing import Tracer
+from checkpoint import RunJournal, CheckpointError
+from convergence import ConvergenceController, SWITCH, STOP
+from validation import LocalValidator, parse_verdict, scratch_project
+from sandbox import SandboxLimits, shared_pool
+from module_plan import ModulePlanError, parse_module_plan, generation_waves, describe_plan, module_interface
 
 import logging
 
@@ -20,14 +40,96 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 
 class CoderAIAgent:
-    def __init__(self, task: str):
+    def __init__(self, task: str, project_name: str = None, config_overrides: dict = None):
         self.task = task
-        self.config = self.load_config()
+        # Each agent owns its tracer, so agents sharing a process never mix their spans
+        self.tracer = Tracer()
+        self.config = {**self.load_config(), **(config_overrides or {})}
         self.setup_logging()
-        self.project_name = self.generate_project_name()
+        self.configure_uv_cache()
+        self.project_name = project_name or self.generate_project_name()
         self.pwd = os.path.join(os.getcwd(), self.project_name)
         self.llm = self.setup_llm()
         self.previous_suggestions = set()
+        self.convergence = self.setup_convergence()
+        self.sandbox = self.setup_sandbox()
+        self.loop = None
+        self.modules = ["main.py"]
+        self.quality_worker = None
+        self.results = {}
+        self.journal = None
+        self.resumed = False
+        self.analysis_store = AnalysisStore()
+        checkpoint_dir = self.checkpoint_dir()
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            self.journal = RunJournal(os.path.join(checkpoint_dir, f"{self.project_name}.json"),
+                                      self.task, self.project_name, self.pwd)
+            # Persisting tool results lets a resumed run skip quality checks and tests on unchanged files
+            self.analysis_store = AnalysisStore(os.path.join(checkpoint_dir, f"{self.project_name}.analysis.json"))
+
+    @classmethod
+    def resume(cls, run: str, config_overrides: dict = None):
+        """Rebuild an agent from the checkpoint of ``run`` (a project name or a journal path)."""
+        path = run
+        if not os.path.isfile(path):
+            with open(CONFIG_PATH, 'r') as f:
+                config = {**json.load(f), **(config_overrides or {})}
+            if not config.get('checkpoint_dir'):
+                raise CheckpointError("Checkpoints are disabled: set checkpoint_dir in config.json")
+            path = os.path.join(os.path.dirname(CONFIG_PATH), config['checkpoint_dir'], f"{run}.json")
+        journal = RunJournal.load(path)
+
+        agent = cls(task=journal.task, project_name=journal.project_name, config_overrides=config_overrides)
+        agent.journal = journal
+        agent.resumed = True
+        agent.pwd = journal.project_dir
+        agent.results = dict(journal.state.get('results', {}))
+        agent.previous_suggestions = set(journal.state.get('previous_suggestions', []))
+        agent.modules = journal.state.get('modules', agent.modules)
+        for suggestion in agent.previous_suggestions:
+            agent.convergence.is_duplicate(suggestion, agent.pwd)
+        agent.logger.info(f"Resuming run {journal.project_name} in {agent.pwd}; "
+                          f"completed stages: {', '.join(journal.data['stages']) or 'none'}")
+        return agent
+
+    def setup_convergence(self):
+        return ConvergenceController(
+            patience=self.config.get('convergence_patience', 1),
+            min_pylint_gain=self.config.get('convergence_min_pylint_gain', 0.25),
+            min_complexity_drop=self.config.get('convergence_min_complexity_drop', 1),
+            similarity_threshold=self.config.get('suggestion_similarity_threshold', 0.95),
+            min_fuzzy_lines=self.config.get('suggestion_min_fuzzy_lines', 5)
+        )
+
+    def setup_sandbox(self):
+        # Agents in one process share the pool, so concurrent runs queue for slots instead of piling up
+        limits = SandboxLimits(
+            wall_time=self.config.get('sandbox_wall_time', 300),
+            cpu_time=self.config.get('sandbox_cpu_time'),
+            memory_mb=self.config.get('sandbox_memory_mb')
+        )
+        return shared_pool(self.config.get('sandbox_pool_size', 4), limits)
+
+    def checkpoint_dir(self):
+        if not self.config.get('checkpoint_dir'):
+            return None
+        return os.path.join(os.path.dirname(CONFIG_PATH), self.config['checkpoint_dir'])
+
+    def checkpoint(self, stage=None, **state):
+        if self.journal is None:
+            return
+        try:
+            self.journal.record(stage, results=self.results, previous_suggestions=sorted(self.previous_suggestions),
+                                modules=self.modules, **state)
+        except OSError as e:
+            self.logger.warning(f"Could not write run checkpoint: {e}")
+
+    def stage_completed(self, stage):
+        if self.journal is not None and self.journal.completed(stage):
+            self.logger.info(f"Skipping {stage}: already completed in a previous run.")
+            return True
+        return False
 
     def load_config(self):
         with open(CONFIG_PATH, 'r') as f:
@@ -37,45 +139,259 @@ class CoderAIAgent:
         logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
         self.logger = logging.getLogger(__name__)
 
+    def configure_uv_cache(self):
+        # A fixed cache directory lets every project (and batch worker) reuse the same downloaded wheels
+        if self.config.get('uv_cache_dir'):
+            os.environ.setdefault('UV_CACHE_DIR',
+                                  os.path.abspath(os.path.join(os.path.dirname(CONFIG_PATH), self.config['uv_cache_dir'])))
+
     def generate_project_name(self):
-        return f"project_{random.randint(100, 999)}"
+        # A name is only free when neither a project directory nor an earlier run's journal uses it,
+        # so a new run can never overwrite a checkpoint that is still resumable
+        checkpoint_dir = self.checkpoint_dir()
+        for attempt in range(1000):
+            # Three digits as before, widening once the short names are mostly taken
+            name = f"project_{random.randint(100, 999) if attempt < 100 else random.randint(1000, 999999)}"
+            journal_taken = checkpoint_dir and os.path.exists(os.path.join(checkpoint_dir, f"{name}.json"))
+            if not os.path.exists(os.path.join(os.getcwd(), name)) and not journal_taken:
+                return name
+        raise RuntimeError("Could not find an unused project name")
 
     def setup_llm(self):
-        #return OllamaAPI(self.config['default_model'], self.config['ollama_api_url'])
-        return GroqAPI(model="mixtral-8x7b-32768")
+        client_options = dict(
+            max_in_flight=self.config['llm_max_in_flight'],
+            max_retries=self.config['llm_max_retries'],
+            backoff_base=self.config['llm_retry_backoff']
+        )
+        cache = None
+        if self.config.get('llm_cache_enabled', False):
+            cache = ResponseCache(
+                os.path.join(os.path.dirname(CONFIG_PATH), self.config['llm_cache_dir']),
+                max_bytes=self.config['llm_cache_max_mb'] * 1024 * 1024,
+                ttl=self.config['llm_cache_ttl']
+            )
 
-    import logging
+        # A provider/model chosen on the command line goes first on every route; the configured chain backs it up
+        override = self.llm_override()
+        routes = {name: ([override] if override else []) + [key for key in keys if key != override]
+                  for name, keys in self.config['llm_routes'].items()}
+
+        clients = {}
+        for key in sorted({key for keys in routes.values() for key in keys}):
+            try:
+                clients[key] = self.create_llm_client(key, client_options, cache)
+            except ValueError as e:
+                self.logger.warning(f"LLM {key} is unavailable: {str(e)}")
+        if not clients:
+            raise LLMError("No configured LLM provider is available")
+        return LLMRouter(
+            clients, routes,
+            window=self.config.get('llm_latency_window', 20),
+            cooldown=self.config.get('llm_failure_cooldown', 60),
+            max_error_rate=self.config.get('llm_max_error_rate', 0.5),
+            latency_factor=self.config.get('llm_latency_factor', 2.0)
+        )
+
+    def llm_override(self):
+        provider, model = self.config.get('llm_provider'), self.config.get('llm_model')
+        if not provider and not model:
+            return None
+        provider = provider or self.config['default_provider']
+        if not model:
+            configured = [key for keys in self.config['llm_routes'].values() for key in keys
+                          if key.startswith(f"{provider}:")]
+            model = configured[0].partition(":")[2] if configured else self.config['default_model']
+        return f"{provider}:{model}"
+
+    def create_llm_client(self, key, client_options, cache=None):
+        provider, _, model = key.partition(":")
+        # Provider SDKs are imported on first use, so only the providers on the configured routes are loaded
+        try:
+            if provider == "ollama":
+                from ollama_api import OllamaAPI
+                llm = OllamaAPI(model, self.config['ollama_api_url'], timeout=self.config['llm_request_timeout'],
+                                **client_options)
+            elif provider == "groq":
+                from groq_api import GroqAPI
+                llm = GroqAPI(model, **client_options)
+            else:
+                raise ValueError(f"unknown provider {provider!r}")
+        except ImportError as e:
+            raise ValueError(f"install requirements-{provider}.txt to use it ({e})") from e
+        return CachedLLM(llm, cache) if cache is not None else llm
+
+    def generate(self, prompt, stage, echo=True, **options):
+        with self.tracer.span(f"llm.{stage}", prompt_tokens=count_tokens(prompt)) as attrs:
+            chunks = []
+            start = time.perf_counter()
+            for chunk in self.llm.stream(prompt, stage=stage, **options):
+                if not chunks:
+                    attrs['ttft'] = time.perf_counter() - start
+                if echo:
+                    print(chunk, end="", flush=True)
+                chunks.append(chunk)
+            if echo:
+                print()  # Print a newline at the end
+            response = "".join(chunks)
+            attrs.update(completion_tokens=count_tokens(response), chunks=len(chunks))
+        return response
+
+    def reject_response(self, prompt, stage, **options):
+        # A response that failed parsing or validation must not be replayed from the cache on the next try
+        self.llm.forget(prompt, stage=stage, **options)
+
+    async def agenerate(self, prompt, stage="candidate", **options):
+        with self.tracer.span(f"llm.{stage}", prompt_tokens=count_tokens(prompt)) as attrs:
+            response = await self.llm.agenerate(prompt, stage=stage, **options)
+            attrs['completion_tokens'] = count_tokens(response)
+        return response
+
+    def log_llm_stats(self):
+        cached = [client for client in self.llm.clients.values() if isinstance(client, CachedLLM)]
+        if cached:
+            self.logger.info(f"LLM cache: {sum(client.hits for client in cached)} hits, "
+                             f"{sum(client.misses for client in cached)} misses")
+        for key, stats in self.llm.stats().items():
+            latency = f"{stats['median_latency']:.2f}s" if stats['median_latency'] is not None else "n/a"
+            self.logger.info(f"LLM {key}: {stats['requests']} requests, error rate {stats['error_rate']:.0%}, "
+                             f"median time to first token {latency}")
+
+    def quality_fingerprint(self, file_path):
+        # pylint resolves imports of sibling modules, so a change to any of them can change this file's result
+        files = set(self.modules) | {file_path}
+        return f"{file_path}:{self.analysis_store.fingerprint(self.pwd, files)}"
+
+    def check_code_quality(self, file_path):
+        fingerprint = self.quality_fingerprint(file_path)
+        cached = self.analysis_store.get("quality", fingerprint)
+        if cached is not None:
+            self.logger.info(f"{file_path} is unchanged since its last analysis; reusing quality results.")
+            return tuple(cached)
+
+        with self.tracer.span("quality", file=file_path):
+            result = check_code_quality(file_path, self.pwd, self.config.get('quality_tool_timeout'),
+                                        worker=self.quality_worker, tracer=self.tracer)
+        if not analysis_succeeded(*result):
+            # A timeout or crashed tool yields placeholder scores; the next check must run the tools again
+            self.logger.warning(f"Quality tools did not complete on {file_path}; not caching the result.")
+            return result
+        self.analysis_store.put("quality", fingerprint, result)
+        # autopep8 may have rewritten the file, so also remember the result under the formatted content
+        self.analysis_store.put("quality", self.quality_fingerprint(file_path), result)
+        return result
+
+    def start_quality_worker(self):
+        if not self.config.get('quality_worker', False):
+            return
+        try:
+            self.quality_worker = QualityWorker(self.pwd, self.config.get('quality_tool_timeout'))
+            self.logger.info("Started persistent quality worker.")
+        except OSError as e:
+            self.logger.warning(f"Could not start quality worker, using subprocesses: {e}")
+
+    def stop_quality_worker(self):
+        if self.quality_worker is not None:
+            self.quality_worker.close()
+            self.quality_worker = None
 
     def run_task(self):
         self.logger.info(f"Current working directory: {os.getcwd()}")
-        self.ensure_uv_installed()
-        self.create_project_with_uv()
-        self.implement_solution()
-
+        if self.journal is not None:
+            self.logger.info(f"Checkpointing to {self.journal.path}; resume with --resume {self.project_name}")
+        try:
+            with self.tracer.span("setup.ensure_uv"):
+                self.ensure_uv_installed()
+            if not self.stage_completed("create_project"):
+                with self.tracer.span("setup.create_project"):
+                    self.create_project_with_uv()
+                self.checkpoint("create_project")
+            if not self.stage_completed("implement"):
+                with self.tracer.span("implement") as attrs:
+                    self.results['implemented'] = attrs['success'] = self.implement_solution()
+                self.checkpoint("implement")
+            if not self.stage_completed("improve_loop"):
+                self.start_quality_worker()
+                with self.tracer.span("improve_loop"):
+                    self.improve_code_quality()
+                self.checkpoint("improve_loop")
+        finally:
+            self.stop_quality_worker()
+            self.close_async()
+            self.log_llm_stats()
+            self.export_trace()
+
+    def run_async(self, coroutine):
+        # One loop for the whole run keeps the async clients' connection pools alive between waves
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        return self.loop.run_until_complete(coroutine)
+
+    def close_async(self):
+        if self.loop is None:
+            return
+        try:
+            self.loop.run_until_complete(self.llm.aclose())
+        finally:
+            self.loop.close()
+            self.loop = None
+
+    def export_trace(self):
+        self.tracer.log_summary()
+        if self.config.get('trace_dir'):
+            trace_dir = os.path.join(os.path.dirname(CONFIG_PATH), self.config['trace_dir'])
+            try:
+                self.tracer.export_chrome_trace(os.path.join(trace_dir, f"{self.project_name}.trace.json"))
+            except OSError as e:
+                self.logger.warning(f"Could not write run trace: {e}")
+
+    def check_modules_quality(self):
+        # Unchanged modules are answered from the analysis store, so only dirty ones reach the tools
+        if len(self.modules) == 1:
+            return {self.modules[0]: self.check_code_quality(self.modules[0])}
+        with ThreadPoolExecutor(max_workers=min(len(self.modules), os.cpu_count() or 1)) as executor:
+            return dict(zip(self.modules, executor.map(self.check_code_quality, self.modules)))
+
+    def improve_code_quality(self):
+        code_check_attempts = self.journal.state.get('improvement_attempt', 1) if self.journal else 1
         try:
-            pylint_score, complexipy_score, pylint_output, complexipy_output = check_code_quality("main.py", self.pwd)
+            quality = self.check_modules_quality()
+            pylint_score, complexipy_score = self.aggregate_quality(quality)
             self.logger.info(
                 f"Initial code quality check - Pylint score: {pylint_score}, Complexipy score: {complexipy_score}")
+            self.record_quality_results(pylint_score, complexipy_score, code_check_attempts - 1, quality)
+            self.convergence.record(pylint_score, complexipy_score)
         except Exception as e:
             self.logger.error(f"Error in initial code quality check: {str(e)}")
             return
 
-        code_check_attempts = 1
         while code_check_attempts < self.config['max_improvement_attempts']:
             try:
                 if pylint_score is None or complexipy_score is None:
                     self.logger.error("Pylint score or Complexipy score is None. Cannot proceed with code improvement.")
                     break
 
-                if pylint_score < self.config['pylint_threshold'] or complexipy_score > self.config[
-                    'complexipy_threshold']:
-                    self.logger.info(f"Attempt {code_check_attempts}: Improving code...")
-                    self.improve_code("main.py", pylint_score, complexipy_score, pylint_output, complexipy_output)
+                failing = [file_path for file_path, (module_pylint, module_complexipy, _, _) in quality.items()
+                           if module_pylint < self.config['pylint_threshold']
+                           or module_complexipy > self.config['complexipy_threshold']]
+                if failing:
+                    self.logger.info(f"Attempt {code_check_attempts}: Improving {', '.join(failing)}...")
+                    with self.tracer.span("improve_code", attempt=code_check_attempts, modules=len(failing)):
+                        applied = self.improve_modules(failing, quality)
 
-                    pylint_score, complexipy_score, pylint_output, complexipy_output = check_code_quality("main.py",
-                                                                                                          self.pwd)
+                    quality = self.check_modules_quality()
+                    pylint_score, complexipy_score = self.aggregate_quality(quality)
                     self.logger.info(
                         f"After improvement - Pylint score: {pylint_score}, Complexipy score: {complexipy_score}")
+                    self.record_quality_results(pylint_score, complexipy_score, code_check_attempts, quality)
+
+                    action = self.convergence.record(pylint_score, complexipy_score, duplicate=not applied)
+                    if action == STOP:
+                        self.logger.info("Scores have plateaued after a strategy switch; stopping improvements early.")
+                        code_check_attempts += 1
+                        self.checkpoint(improvement_attempt=code_check_attempts)
+                        break
+                    if action == SWITCH:
+                        self.logger.info("Scores have plateaued; switching to full-file rewrites.")
                 else:
                     self.logger.info("Code quality meets the thresholds. No further improvements needed.")
                     break
@@ -84,9 +400,36 @@ class CoderAIAgent:
                 break
 
             code_check_attempts += 1
+            self.checkpoint(improvement_attempt=code_check_attempts)
 
         self.logger.info(f"Code improvement process completed after {code_check_attempts} attempts.")
 
+    def aggregate_quality(self, quality):
+        # The project is only as good as its worst module
+        pylint_scores = [result[0] for result in quality.values()]
+        complexipy_scores = [result[1] for result in quality.values()]
+        if None in pylint_scores or None in complexipy_scores:
+            return None, None
+        return min(pylint_scores), max(complexipy_scores)
+
+    def improve_modules(self, file_paths, quality):
+        if len(file_paths) == 1:
+            return self.improve_code(file_paths[0], *quality[file_paths[0]])
+        # Streams from concurrent improvements would interleave on the console, so they run silently
+        with ThreadPoolExecutor(max_workers=min(len(file_paths), self.config['llm_max_in_flight'])) as executor:
+            applied = list(executor.map(
+                lambda file_path: self.improve_code(file_path, *quality[file_path], echo=False), file_paths))
+        return any(applied)
+
+    def record_quality_results(self, pylint_score, complexipy_score, improvement_attempts, quality=None):
+        self.results.update(
+            pylint_score=pylint_score,
+            complexipy_score=complexipy_score,
+            improvement_attempts=improvement_attempts
+        )
+        if quality and len(quality) > 1:
+            self.results['module_scores'] = {file_path: [result[0], result[1]] for file_path, result in quality.items()}
+
     def ensure_uv_installed(self):
         try:
             subprocess.run(["uv", "--version"], check=True, capture_output=True, text=True)
@@ -102,18 +445,37 @@ class CoderAIAgent:
 
     def create_project_with_uv(self):
         self.logger.info(f"Creating new uv project: {self.project_name}")
+        if self.resumed and os.path.isdir(self.pwd):
+            # Left behind by a run that died while creating the project
+            shutil.rmtree(self.pwd, ignore_errors=True)
+        try:
+            os.mkdir(self.pwd)
+        except FileExistsError:
+            raise FileExistsError(f"Project directory {self.pwd} already exists; refusing to overwrite it") from None
+        if self.config.get('project_template_pool', False):
+            try:
+                pool = ProjectTemplatePool(os.path.join(os.path.dirname(CONFIG_PATH),
+                                                        self.config['project_template_dir']))
+                pool.checkout(self.pwd, self.project_name)
+                self.logger.info(f"Project created from template: {self.pwd}")
+                return
+            except (subprocess.CalledProcessError, OSError) as e:
+                self.logger.warning(f"Project template unavailable, creating project from scratch: {e}")
+                # The directory was created above, so clearing it only discards the partial checkout
+                shutil.rmtree(self.pwd, ignore_errors=True)
+                os.mkdir(self.pwd)
+
         try:
             subprocess.run(["uv", "init", self.project_name, "--no-workspace"], capture_output=True, text=True,
                            check=True)
-            subprocess.run(["uv", "add", "pytest", "pylint", "autopep8", "pytest-cov", "complexipy"], check=True,
-                           cwd=self.pwd)
+            subprocess.run(["uv", "add"] + DEV_DEPENDENCIES, check=True, cwd=self.pwd)
 
             tests_dir = os.path.join(self.pwd, "tests")
             os.makedirs(tests_dir, exist_ok=True)
             os.remove(os.path.join(self.pwd, "hello.py"))
 
             with open(os.path.join(tests_dir, '__init__.py'), 'w') as f:
-                f.write("# This file is required to make Python treat the directory as containing packages.\n")
+                f.write(TESTS_INIT_CONTENT)
 
         except subprocess.CalledProcessError as e:
             self.logger.error(f"Error creating uv project: {e.stderr}")
@@ -147,7 +509,7 @@ class CoderAIAgent:
             8. IMPORTANT: Do not modify the existing uv dependencies. Only add new ones if necessary.
             9. CRITICAL: Only create 1 file for the python code: main.py
             10. CRITICAL: Only create 1 file for the python tests: tests/test_main.py
-            11. CRITICAL: Create a main method to run the app in main.py and if a web app run the app on port 8080.
+            11. CRITICAL: Create a main method to run the app in main.py and if a web app run the app on the port given by the PORT environment variable (default 8080); tests that start the server must read the same variable.
             12. IMPORTANT: Only use pytest fixtures for Flask and FastAPI servers.
             13. IMPORTANT: Always pytest parameterize tests for different cases.
             14. CRITICAL: Always use `import main` to import the main.py file in the test file.
@@ -155,143 +517,488 @@ class CoderAIAgent:
         Working directory: {self.pwd}
         """
 
+        if self.config.get('module_planning', False):
+            plan = self.plan_modules()
+            if plan is not None and len(plan) > 1:
+                if self.implement_modules(plan, max_attempts):
+                    return True
+                self.logger.warning("Multi-module generation failed; falling back to a single main.py.")
+                self.discard_modules(plan)
+                self.modules = ["main.py"]
+
+        candidates = self.config.get('speculative_candidates', 1)
+        if candidates > 1 and self.implement_speculatively(prompt, candidates):
+            return True
+
         for attempt in range(max_attempts):
             self.logger.info(f"Attempt {attempt + 1} to implement solution")
             try:
-                solution = self.llm.generate(prompt)
+                with self.tracer.span("implement.attempt", attempt=attempt + 1):
+                    solution, written = self.stream_file_changes(prompt, self.implementation_stream_validator(),
+                                                                 attempt)
                 self.logger.info(f"Received solution (first 100 characters):\n{solution[:100]}...")
+            except StreamValidationError as e:
+                self.logger.warning(f"Aborted generation early: {str(e)}")
+                continue
             except Exception as e:
                 self.logger.error(f"Error generating solution: {str(e)}")
                 continue
 
-            uv_commands = [line.strip() for line in solution.split("\n") if
-                           line.strip().strip('.').startswith("uv add")]
-            for command in uv_commands:
-                try:
-                    self.logger.info(f"Executing command: {command}")
-                    subprocess.run(command, shell=True, check=True, cwd=self.pwd)
-                    self.logger.info(f"Successfully executed command: {command}")
-                except subprocess.CalledProcessError as e:
-                    self.logger.error(f"Failed to execute command: {command}. Error: {str(e)}")
+            self.run_uv_commands(solution)
 
             try:
-                success = self.process_file_changes(solution)
+                success = all(written.values())
                 if success:
                     self.logger.info("All files created successfully and passed pylint check")
                     return True
                 else:
                     self.logger.warning(f"Attempt {attempt + 1} failed to create the correct files or pass pylint.")
+                    self.reject_response(prompt, "implement", cache_nonce=attempt or None)
             except Exception as e:
                 self.logger.error(f"Error processing file changes: {str(e)}")
 
         self.logger.error("Failed to implement solution after maximum attempts")
         return False
 
-    def process_file_changes(self, proposed_changes):
-        file_contents = extract_file_contents(proposed_changes)
-        success = True
+    def plan_modules(self):
+        prompt = PLANNING_PROMPT.format(task=self.task, max_modules=self.config.get('max_modules', 6))
+        try:
+            plan = parse_module_plan(self.generate(prompt, "plan"), self.config.get('max_modules', 6))
+            waves = generation_waves(plan)
+        except (ModulePlanError, LLMError) as e:
+            self.logger.warning(f"Could not plan modules, generating a single main.py: {str(e)}")
+            if isinstance(e, ModulePlanError):
+                self.reject_response(prompt, "plan")
+            return None
+        self.logger.info(f"Module plan ({len(waves)} generation waves):\n{describe_plan(plan)}")
+        return plan
+
+    def module_prompt(self, spec, plan):
+        interfaces = []
+        for dependency in spec.depends_on:
+            full_path = os.path.join(self.pwd, f"{dependency}.py")
+            with open(full_path, 'r') as f:
+                interfaces.append(f"{dependency}.py:\n{module_interface(f.read())}")
+        return MODULE_PROMPT.format(
+            task=self.task,
+            file_path=spec.file_path,
+            test_path=spec.test_path,
+            module=spec.name,
+            description=spec.description,
+            plan=describe_plan(plan),
+            dependencies="\n\n".join(interfaces) or "None",
+            example_dependency=spec.depends_on[0] if spec.depends_on else "other_module",
+            entry_point_rule=ENTRY_POINT_RULE if spec.name == "main" else "",
+            working_dir=self.pwd
+        )
 
-        for file_path, content in file_contents.items():
-            full_path = os.path.join(self.pwd, file_path)
+    async def generate_modules(self, prompts, attempt):
+        return await asyncio.gather(
+            *(self.agenerate(prompt, stage="implement_module", cache_nonce=attempt or None) for prompt in prompts),
+            return_exceptions=True
+        )
+
+    def implement_modules(self, plan, max_attempts):
+        self.modules = [spec.file_path for spec in plan]
+        # Modules of one wave only depend on earlier waves, so each wave is generated concurrently
+        for wave in generation_waves(plan):
+            pending = wave
+            for attempt in range(max_attempts):
+                self.logger.info(f"Generating {', '.join(spec.file_path for spec in pending)} (attempt {attempt + 1})")
+                prompts = [self.module_prompt(spec, plan) for spec in pending]
+                with self.tracer.span("implement.wave", modules=len(pending), attempt=attempt + 1):
+                    responses = self.run_async(self.generate_modules(prompts, attempt))
+                failed = []
+                for spec, prompt, response in zip(pending, prompts, responses):
+                    if isinstance(response, Exception):
+                        self.logger.error(f"Failed to generate {spec.file_path}: {str(response)}")
+                        failed.append(spec)
+                    elif not self.apply_module(spec, response):
+                        self.reject_response(prompt, "implement_module", cache_nonce=attempt or None)
+                        failed.append(spec)
+                pending = failed
+                if not pending:
+                    break
+            if pending:
+                self.logger.error(f"Could not generate {', '.join(spec.file_path for spec in pending)}")
+                return False
+        return True
+
+    def discard_modules(self, plan):
+        # Leftover modules and their tests would still be collected by pytest, measured by coverage and exported
+        removed = []
+        for spec in plan:
+            for path in (spec.file_path, spec.test_path):
+                try:
+                    os.remove(os.path.join(self.pwd, path))
+                    removed.append(path)
+                except FileNotFoundError:
+                    pass
+        if removed:
+            self.logger.info(f"Removed files of the abandoned module plan: {', '.join(removed)}")
+
+    def apply_module(self, spec, response):
+        if spec.file_path not in extract_file_contents(response):
+            self.logger.warning(f"Response for {spec.file_path} does not contain the module.")
+            return False
+        self.run_uv_commands(response)
+        success, _ = self.process_file_changes(response, allowed_files={spec.file_path, spec.test_path})
+        return success
+
+    def run_uv_commands(self, solution, cwd=None):
+        cwd = cwd or self.pwd
+        requested = parse_uv_add_commands(solution)
+        if not requested:
+            return
+        packages = missing_dependencies(requested, cwd)
+        skipped = [spec for spec in requested if spec not in packages]
+        if skipped:
+            self.logger.info(f"Dependencies already available, skipping: {', '.join(skipped)}")
+        with self.tracer.span("setup.dependencies", packages=len(packages)):
+            success, elapsed = install_dependencies(packages, cwd, self.config.get('dependency_install_timeout'))
+        self.results['dependency_time'] = self.results.get('dependency_time', 0.0) + elapsed
+        if packages:
+            self.logger.info(f"Dependency resolution took {elapsed:.2f}s (success={success}, "
+                             f"total {self.results['dependency_time']:.2f}s this run)")
+
+    async def generate_candidates(self, prompt, count):
+        temperature = self.config.get('speculative_temperature', 0.8)
+        # Distinct seeds keep the candidates (and their cache keys) from collapsing into one answer
+        return await asyncio.gather(
+            *(self.agenerate(prompt, seed=index, temperature=temperature) for index in range(count)),
+            return_exceptions=True
+        )
+
+    def implement_speculatively(self, prompt, count):
+        self.logger.info(f"Requesting {count} candidate solutions concurrently")
+        solutions, seeds = [], []
+        for index, result in enumerate(self.run_async(self.generate_candidates(prompt, count))):
+            if isinstance(result, Exception):
+                self.logger.error(f"Candidate {index + 1} failed to generate: {str(result)}")
+            else:
+                solutions.append(result)
+                seeds.append(index)
+
+        with ThreadPoolExecutor(max_workers=max(len(solutions), 1)) as executor:
+            with self.tracer.span("implement.score_candidates", candidates=len(solutions)):
+                scores = list(executor.map(self.score_candidate, solutions))
+        temperature = self.config.get('speculative_temperature', 0.8)
+        for seed, score in zip(seeds, scores):
+            if score is None:
+                self.reject_response(prompt, "candidate", seed=seed, temperature=temperature)
+
+        ranked = sorted(((score, index) for index, score in enumerate(scores) if score is not None), reverse=True)
+        for score, index in ranked:
+            tests_passed, coverage, pylint_score = score
+            self.logger.info(f"Selected candidate {index + 1}: tests passed={tests_passed}, "
+                             f"coverage={coverage}%, pylint={pylint_score}")
+            # Only the winner's dependencies are added to the project; the losers' were installed into
+            # environments private to their scratch copies, which are gone by now
+            self.run_uv_commands(solutions[index])
+            if self.process_file_changes(solutions[index])[0]:
+                return True
+            self.logger.warning(f"Failed to apply candidate {index + 1}; trying the next best one.")
+
+        self.logger.warning("No speculative candidate was usable; falling back to sequential attempts.")
+        return False
+
+    def score_candidate(self, solution):
+        file_contents = extract_file_contents(solution)
+        if "main.py" not in file_contents:
+            return None
+
+        # A candidate that installs packages gets its own environment, so the project's stays untouched
+        # while the other candidates' tests run against it
+        share_venv = not missing_dependencies(parse_uv_add_commands(solution), self.pwd)
+        try:
+            with scratch_project(self.pwd, file_contents, prefix=f"{self.project_name}_candidate_",
+                                 share_venv=share_venv) as scratch_dir:
+                self.run_uv_commands(solution, cwd=scratch_dir)
+                tests_passed, coverage_percentage, _ = self.run_tests(cwd=scratch_dir)
+                pylint_score, _ = run_pylint("main.py", scratch_dir, self.config.get('quality_tool_timeout'))
+            return tests_passed, coverage_percentage, pylint_score
+        except ValueError as e:
+            self.logger.warning(f"Discarding candidate: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error scoring candidate: {str(e)}")
+            return None
+
+    def implementation_stream_validator(self):
+        if not self.config.get('stream_validation', False):
+            return None
+        return StreamValidator(
+            allowed_files=["main.py", "tests/test_main.py"],
+            max_prose_lines=self.config.get('stream_max_prose_lines')
+        )
+
+    def stream_file_changes(self, prompt, validator=None, attempt=0):
+        parser = StreamingFileParser()
+        written = {}
+        # Retries carry a nonce so they reach the model instead of replaying the cached first attempt
+        stream = self.llm.stream(prompt, stage="implement", cache_nonce=attempt or None)
+        with self.tracer.span("llm.implement", prompt_tokens=count_tokens(prompt)) as attrs:
+            start = time.perf_counter()
             try:
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                content = validate_file_content(full_path, content)
-
-                if content is not None:
-                    if robust_write_file(full_path, content, self.config['max_write_attempts'],
-                                         self.config['write_retry_delay']):
-                        self.logger.info(f"File written successfully: {full_path}")
-                    else:
-                        self.logger.error(f"Failed to write file: {full_path}")
-                        success = False
-                else:
-                    self.logger.error(f"Invalid content for file: {full_path}")
-                    success = False
+                for chunk in stream:
+                    if 'ttft' not in attrs:
+                        attrs['ttft'] = time.perf_counter() - start
+                    print(chunk, end="", flush=True)
+                    completed = parser.feed(chunk)
+                    if validator is not None:
+                        validator.feed(chunk, parser)
+                    # Each file is validated and written as soon as its block closes, while later blocks still stream
+                    for file_path, content in completed:
+                        written[file_path] = self.write_file_change(file_path, content)
+            finally:
+                # Closing the generator cancels the underlying HTTP stream when we stop early
+                stream.close()
+                print()  # Print a newline at the end
+                attrs.update(completion_tokens=count_tokens(parser.text), files=len(written))
+        return parser.text, written
+
+    def process_file_changes(self, proposed_changes, allowed_files=None):
+        """Validate and write the files in a response; returns (success, paths whose patches conflicted)."""
+        file_contents, conflicts = resolve_file_changes(proposed_changes, self.pwd)
+        success = not conflicts
+        validated = {}
+
+        if allowed_files is not None:
+            ignored = [file_path for file_path in file_contents if file_path not in allowed_files]
+            if ignored:
+                self.logger.warning(f"Ignoring files outside this module: {', '.join(ignored)}")
+            file_contents = {path: content for path, content in file_contents.items() if path in allowed_files}
 
-            except Exception as e:
-                self.logger.error(f"Error writing file {full_path}: {str(e)}")
+        for file_path, content in file_contents.items():
+            full_path = os.path.join(self.pwd, file_path)
+            content = validate_file_content(full_path, content)
+            if content is None:
+                self.logger.error(f"Invalid content for file: {full_path}")
                 success = False
+            else:
+                validated[full_path] = content
 
-        return success
+        if not validated:
+            return success, conflicts
 
-    def improve_code(self, file_path, current_pylint_score, current_complexipy_score, pylint_output, complexipy_output):
-        prompt = IMPROVEMENT_PROMPT.format(
-            file_path=file_path,
-            current_pylint_score=current_pylint_score,
-            current_complexipy_score=current_complexipy_score,
-            pylint_output=pylint_output,
-            complexipy_output=complexipy_output,
-            task=self.task,
-            working_dir=self.pwd
-        )
+        try:
+            with self.tracer.span("write_files", files=len(validated)):
+                write_files_atomically(validated)
+            self.logger.info(f"Files written successfully: {', '.join(validated)}")
+        except OSError as e:
+            self.logger.error(f"Error writing files {', '.join(validated)}: {str(e)}")
+            success = False
 
-        proposed_improvements = self.llm.generate(prompt)
+        return success, conflicts
 
-        if proposed_improvements in self.previous_suggestions:
-            self.logger.info("No new improvements suggested. Moving on.")
-            return current_pylint_score, current_complexipy_score
+    def write_file_change(self, file_path, content):
+        full_path = os.path.join(self.pwd, file_path)
+        try:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            content = validate_file_content(full_path, content)
+
+            if content is not None:
+                with self.tracer.span("write_files", files=1):
+                    written = robust_write_file(full_path, content, self.config['max_write_attempts'],
+                                                self.config['write_retry_delay'])
+                if written:
+                    self.logger.info(f"File written successfully: {full_path}")
+                    return True
+                self.logger.error(f"Failed to write file: {full_path}")
+            else:
+                self.logger.error(f"Invalid content for file: {full_path}")
+
+        except Exception as e:
+            self.logger.error(f"Error writing file {full_path}: {str(e)}")
+        return False
+
+    def format_instructions(self, file_path, patch_mode):
+        if patch_mode:
+            full_path = os.path.join(self.pwd, file_path)
+            content = ""
+            if os.path.exists(full_path):
+                with open(full_path, 'r') as f:
+                    content = f.read()
+            return (PATCH_FORMAT.format(file_path=file_path),
+                    CURRENT_CODE_SECTION.format(file_path=file_path, content=content))
+        return FULL_FILE_FORMAT.format(file_path=file_path), ""
+
+    def applicable_changes(self, prompt, stage, proposed_changes, full_file_prompt, echo=True):
+        """Return a response whose edits apply to the project, asking once for whole files if patches conflict.
+
+        The result still has to pass dedupe and validation like any other suggestion; None when
+        not even the full-file answer applies.
+        """
+        _, conflicts = resolve_file_changes(proposed_changes, self.pwd)
+        if not conflicts:
+            return proposed_changes
+        # The model's edits no longer match the file; ask once for whole files instead
+        self.logger.warning(f"Patches did not apply to {', '.join(conflicts)}; requesting full file content instead.")
+        self.reject_response(prompt, stage)
+        fallback_prompt = full_file_prompt()
+        fallback = self.generate(fallback_prompt, "patch_fallback", echo=echo)
+        _, conflicts = resolve_file_changes(fallback, self.pwd)
+        if conflicts:
+            self.logger.warning(f"Full file response still holds patches that do not apply to {', '.join(conflicts)}.")
+            self.reject_response(fallback_prompt, "patch_fallback")
+            return None
+        return fallback
+
+    def improve_code(self, file_path, current_pylint_score, current_complexipy_score, pylint_output, complexipy_output,
+                     echo=True):
+        if self.config.get('prompt_compaction', False):
+            raw_tokens = count_tokens(pylint_output) + count_tokens(complexipy_output)
+            pylint_output, complexipy_output = compact_quality_outputs(
+                pylint_output, complexipy_output, self.config['prompt_issue_token_budget'],
+                self.config['complexipy_threshold'])
+            self.logger.info(f"Compacted tool output from {raw_tokens} to "
+                             f"{count_tokens(pylint_output) + count_tokens(complexipy_output)} tokens")
+
+        def build_prompt(patch_mode):
+            format_instructions, current_code = self.format_instructions(file_path, patch_mode)
+            return IMPROVEMENT_PROMPT.format(
+                file_path=file_path,
+                current_pylint_score=current_pylint_score,
+                current_complexipy_score=current_complexipy_score,
+                pylint_output=pylint_output,
+                complexipy_output=complexipy_output,
+                current_code=current_code,
+                format_instructions=format_instructions,
+                task=self.task,
+                working_dir=self.pwd
+            )
+
+        # Once patches stop paying off, the controller switches to asking for the whole file
+        patch_mode = self.config.get('patch_mode', False) and not self.convergence.switched
+        prompt = build_prompt(patch_mode)
+        self.logger.info(f"Improvement prompt size: {count_tokens(prompt)} tokens")
+        proposed_improvements = self.applicable_changes(prompt, "improve", self.generate(prompt, "improve", echo=echo),
+                                                        lambda: build_prompt(False), echo=echo)
+        if proposed_improvements is None:
+            return False
+
+        if self.convergence.is_duplicate(proposed_improvements, self.pwd):
+            self.logger.info("Suggested improvements repeat an earlier suggestion. Moving on.")
+            self.reject_response(prompt, "improve")
+            return False
 
         self.previous_suggestions.add(proposed_improvements)
 
-        if self.validate_implementation(proposed_improvements):
-            self.logger.info("Executing validated improvements:")
-            self.process_file_changes(proposed_improvements)
+        with self.tracer.span("validate"):
+            valid = self.validate_implementation(proposed_improvements, echo=echo)
+        if not valid:
+            self.reject_response(prompt, "improve")
+            return False
+        self.logger.info(f"Executing validated improvements for {file_path}:")
+        success, _ = self.process_file_changes(proposed_improvements)
+        return success
 
     def improve_test_file(self, test_output):
-        prompt = TEST_IMPROVEMENT_PROMPT.format(
-            test_output=test_output,
-            task=self.task,
-            working_dir=self.pwd
-        )
-        proposed_improvements = self.llm.generate(prompt)
+        test_path = "tests/test_main.py"
+
+        def build_prompt(patch_mode):
+            format_instructions, current_code = self.format_instructions(test_path, patch_mode)
+            return TEST_IMPROVEMENT_PROMPT.format(
+                test_output=test_output,
+                current_code=current_code,
+                format_instructions=format_instructions,
+                task=self.task,
+                working_dir=self.pwd
+            )
+
+        prompt = build_prompt(self.config.get('patch_mode', False))
+        self.logger.info(f"Test improvement prompt size: {count_tokens(prompt)} tokens")
+        proposed_improvements = self.applicable_changes(prompt, "improve_tests", self.generate(prompt, "improve_tests"),
+                                                        lambda: build_prompt(False))
+        if proposed_improvements is None:
+            self.logger.warning("Proposed test improvements do not apply to the current tests. No changes were made.")
+            return
 
         if self.validate_implementation(proposed_improvements):
             self.logger.info("Executing validated test improvements:")
-            success = self.process_file_changes(proposed_improvements)
+            success, _ = self.process_file_changes(proposed_improvements)
             if success:
                 self.logger.info("Test improvements have been applied. Please review the changes manually.")
             else:
                 self.logger.warning("Failed to apply some or all test improvements.")
         else:
             self.logger.warning("Proposed test improvements do not align with the original task. No changes were made.")
+            self.reject_response(prompt, "improve_tests")
+
+    def validate_implementation(self, proposed_improvements, echo=True):
+        # Dry-run the change first: the judge must never approve edits that cannot be applied
+        file_contents, conflicts = resolve_file_changes(proposed_improvements, self.pwd)
+        if conflicts:
+            self.logger.warning(f"Proposed changes do not apply to {', '.join(conflicts)}; rejecting them.")
+            return False
+        invalid = [path for path, content in file_contents.items()
+                   if validate_file_content(os.path.join(self.pwd, path), content) is None]
+        if invalid:
+            self.logger.warning(f"Proposed changes leave invalid content in {', '.join(invalid)}; rejecting them.")
+            return False
+
+        if self.config.get('local_validation', False):
+            validator = LocalValidator(self.pwd, self.config.get('validation_quick_tests', True),
+                                       self.config.get('validation_test_timeout', 60), self.sandbox,
+                                       self.analysis_store)
+            with self.tracer.span("validate.local") as attrs:
+                verdict, reason = validator.validate(file_contents)
+                attrs.update(verdict=verdict, reason=reason)
+            if verdict is not None:
+                self.logger.info(f"Local validation {'passed' if verdict else 'failed'}: {reason}")
+                return verdict
+            self.logger.info(f"Local validation inconclusive ({reason}); asking the LLM to judge.")
 
-    def validate_implementation(self, proposed_improvements):
         prompt = VALIDATION_PROMPT.format(
             proposed_improvements=proposed_improvements,
             task=self.task
         )
-        response = self.llm.generate(prompt)
+        verdict = parse_verdict(self.generate(prompt, "validate", echo=echo))
+        if verdict is None:
+            self.reject_response(prompt, "validate")
 
-        if "VALID" in response.upper():
+        if verdict:
             self.logger.info("Implementation validated successfully.")
             return True
+        if verdict is None:
+            self.logger.warning("Validation response held no VALID/INVALID verdict; rejecting the change.")
         else:
             self.logger.warning("Implementation does not match the original task.")
-            return False
+        return False
+
+    def run_tests(self, cwd=None):
+        cwd = cwd or self.pwd
+        fingerprint = self.analysis_store.fingerprint(cwd, python_sources(cwd))
+        cached = self.analysis_store.get("pytest", fingerprint)
+        if cached is not None:
+            self.logger.info("Sources are unchanged since the last test run; reusing pytest results.")
+            return tuple(cached)
 
-    def run_tests(self):
         self.logger.info("Running tests and checking code quality...")
         try:
-            with open(os.path.join(self.pwd, ".coveragerc"), "w") as f:
+            with open(os.path.join(cwd, ".coveragerc"), "w") as f:
                 f.write(COVERAGERC_CONTENT.format(project_name=self.project_name))
 
-            result = subprocess.run(
-                PYTEST_CMD + [f"--cov={self.pwd}"],
-                capture_output=True,
-                text=True,
-                cwd=self.pwd,
-            )
+            prepare_report_dir(cwd)
+            with self.tracer.span("pytest"):
+                result = self.sandbox.run(build_pytest_command(cwd, self.config.get('test_parallel', False)), cwd)
             test_output = result.stdout + result.stderr
             self.logger.info("Pytest output:\n%s", test_output)
-
-            if "No data to report." in test_output:
-                self.logger.warning("No coverage data was collected. Ensure that the tests are running correctly.")
-                return False, 0, test_output
-
-            coverage_match = re.search(COVERAGE_PATTERN, test_output)
-            coverage_percentage = int(coverage_match.group(1)) if coverage_match else 0
-
-            tests_passed = "failed" not in test_output.lower() and result.returncode == 0
+            if result.timed_out:
+                self.logger.warning(f"Tests were killed after {self.sandbox.limits.wall_time}s; treating them as failed.")
+
+            report = read_test_reports(cwd)
+            if report is None or report.coverage is None:
+                if "No data to report." in test_output:
+                    self.logger.warning("No coverage data was collected. Ensure that the tests are running correctly.")
+                    return False, 0, test_output
+                # Reports are missing (e.g. collection crashed), so fall back to scraping the console output
+                coverage_match = re.search(COVERAGE_PATTERN, test_output)
+                coverage_percentage = int(coverage_match.group(1)) if coverage_match else 0
+                tests_passed = "failed" not in test_output.lower() and result.returncode == 0
+            else:
+                tests_passed = report.passed and result.returncode == 0
+                coverage_percentage = int(report.coverage)
 
             if tests_passed and coverage_percentage >= self.config['coverage_threshold']:
                 self.logger.info(f"All tests passed successfully and coverage is {coverage_percentage}%.")
@@ -302,6 +1009,9 @@ class CoderAIAgent:
                     self.logger.warning(
                         f"Coverage is below {self.config['coverage_threshold']}%. Current coverage: {coverage_percentage}%")
 
+            # Only a run that finished and wrote its reports is a result worth replaying
+            if report is not None and not result.timed_out:
+                self.analysis_store.put("pytest", fingerprint, (tests_passed, coverage_percentage, test_output))
             return tests_passed, coverage_percentage, test_output
 
         except subprocess.CalledProcessError as e:
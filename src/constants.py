@@ -22,26 +22,39 @@ exclude_lines =
     def main
 """
 
+TESTS_INIT_CONTENT = "# This file is required to make Python treat the directory as containing packages.\n"
+DEV_DEPENDENCIES = ["pytest", "pylint", "autopep8", "pytest-cov", "pytest-xdist", "complexipy"]
+PYTEST_REPORT_DIR = ".pytest_reports"
+PYTEST_JUNIT_REPORT = os.path.join(PYTEST_REPORT_DIR, "junit.xml")
+PYTEST_COVERAGE_REPORT = os.path.join(PYTEST_REPORT_DIR, "coverage.json")
+
 # Regex patterns
 FILE_CONTENT_PATTERN = r"<<<(.+?)>>>\n(.*?)<<<end>>>"
+PATCH_BLOCK_PREFIX = "patch:"
+SEARCH_REPLACE_PATTERN = r"<<<<<<< SEARCH\n(.*?)\n?=======\n(.*?)\n?>>>>>>> REPLACE"
 PYLINT_SCORE_PATTERN = r"Your code has been rated at (\d+\.\d+)/10"
 COMPLEXIPY_SCORE_PATTERN = r"🧠 Total Cognitive Complexity in\s*{escaped_path}:\s*(\d+)"
 COVERAGE_PATTERN = r"TOTAL\s+\d+\s+\d+\s+(\d+)%"
 
 # Command lists
-AUTOPEP8_CMD = ["uv", "run", "autopep8", "--in-place", "--aggressive"]
-PYLINT_CMD = [
-    "uv", "run", "pylint",
+AUTOPEP8_ARGS = ["--in-place", "--aggressive"]
+AUTOPEP8_CMD = ["uv", "run", "autopep8"] + AUTOPEP8_ARGS
+PYLINT_ARGS = [
     "--disable=missing-function-docstring,missing-module-docstring",
     "--max-line-length=120"
 ]
+PYLINT_CMD = ["uv", "run", "pylint"] + PYLINT_ARGS
 COMPLEXIPY_CMD = ["uv", "run", "complexipy"]
+LINT_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lint_worker.py')
+LINT_WORKER_CMD = ["uv", "run", "python", LINT_WORKER_PATH]
 PYTEST_CMD = [
     "uv", "run", "pytest",
     "--cov-config=.coveragerc",
     "--cov-report=term-missing",
     "-vv"
 ]
+PYTEST_PARALLEL_ARGS = ["-n", "auto"]
+PYTEST_QUICK_CMD = ["uv", "run", "pytest", "-x", "-q", "-rfE", "-p", "no:cacheprovider"]
 
 # Prompts
 IMPROVEMENT_PROMPT = """
@@ -56,7 +69,7 @@ Pylint output:
 
 Complexipy output:
 {complexipy_output}
-
+{current_code}
 Original task: {task}
 
 Provide specific code changes to improve the score and address any issues.
@@ -66,21 +79,18 @@ Follow these rules strictly:
 3. Focus on improving code quality, readability, and adherence to PEP8
 4. Address any warnings or errors reported by pylint
 5. Ensure the implementation correctly handles edge cases and potential errors
-6. CRITICAL: Use the following code block format for specifying file content:
-        <<<main.py>>>
-        # File content here
-        <<<end>>>
+6. {format_instructions}
 7. CRITICAL: Do not explain the task only implement the required functionality in the code blocks.
 Working directory: {working_dir}
 """
 
 TEST_IMPROVEMENT_PROMPT = """
 The current test file needs minor improvements. Please analyze the test output and suggest small, specific changes to fix any issues in the test file.
-Do not modify the main implementation file, only suggest minimal improvements to the tests but write out the full test file content.
+Do not modify the main implementation file, only suggest minimal improvements to the tests.
 
 Test output:
 {test_output}
-
+{current_code}
 Original task: {task}
 
 Provide specific, minimal code changes to improve the test file, addressing only the failing tests or obvious issues.
@@ -89,11 +99,7 @@ Follow these rules strictly:
 2. Do not change the code file in main.py
 3. Focus on fixing failing tests or obvious errors
 4. Do not rewrite entire test functions unless absolutely necessary
-5. CRITICAL: Use the following code block format for specifying file content:
-    For test files, use:
-    <<<tests/test_main.py>>>
-    # Test file content here
-    <<<end>>>
+5. {format_instructions}
 6. CRITICAL: Do not explain the task only implement the required functionality in the code blocks.
 7. IMPORTANT: Only use pytest fixtures for Flask and FastAPI servers.
 8. IMPORTANT: Always pytest parameterize tests for different cases.
@@ -102,9 +108,73 @@ Follow these rules strictly:
 Working directory: {working_dir}
 """
 
+FULL_FILE_FORMAT = """CRITICAL: Write out the full content of {file_path} using the following code block format:
+        <<<{file_path}>>>
+        # File content here
+        <<<end>>>"""
+
+PATCH_FORMAT = """CRITICAL: Only send the parts of {file_path} that change, as search/replace edits in this format:
+        <<<patch:{file_path}>>>
+        <<<<<<< SEARCH
+        exact lines copied from the current file
+        =======
+        replacement lines
+        >>>>>>> REPLACE
+        <<<end>>>
+   Each SEARCH section must match the current file exactly and be unique in it.
+   Use one SEARCH/REPLACE pair per separate change inside the same patch block."""
+
+CURRENT_CODE_SECTION = """
+Current content of {file_path}:
+{content}
+"""
+
 VALIDATION_PROMPT = """
 Review the proposed improvements: {proposed_improvements} and confirm if it correctly addresses the original task: {task}
 If the implementation is correct or mostly correct, respond with 'VALID'.
 If the implementation is completely unrelated or fundamentally flawed, respond with 'INVALID'.
 Do not provide any additional information or explanations.
-"""
\ No newline at end of file
+"""
+PLANNING_PROMPT = """
+Plan the module layout of a Python project for the task: {task}
+Split the code into at most {max_modules} cohesive modules with clear, separate responsibilities.
+Always include a "main" module that only wires the other modules together and provides the entry point.
+If the task is small, plan a single "main" module.
+Respond ONLY with JSON in this format:
+{{"modules": [{{"name": "snake_case_name", "description": "public functions/classes it provides", "depends_on": ["other_module"]}}]}}
+Module dependencies must not form a cycle.
+"""
+
+MODULE_PROMPT = """
+Implement one module of a Python project for the task: {task}
+
+Module to write: {file_path}
+Responsibility: {description}
+
+Project plan:
+{plan}
+
+Interfaces of the project modules it depends on:
+{dependencies}
+
+You must follow these rules strictly:
+    1. IMPORTANT: Never use pass statements in your code or tests. Always provide a meaningful implementation.
+    2. CRITICAL: Only create {file_path} and {test_path}, using the following code block format:
+        <<<{file_path}>>>
+        # File content here
+        <<<end>>>
+
+        <<<{test_path}>>>
+        # Test file content here
+        <<<end>>>
+    3. IMPORTANT: Do not add any code comments to the files.
+    4. IMPORTANT: Always follow PEP8 style guide, follow best practices for Python, use snake_case naming, and provide meaningful docstrings.
+    5. CRITICAL: Import other project modules by name (e.g. `import {example_dependency}`) and only use the interfaces listed above.
+    6. CRITICAL: Always use `import {module}` to import the module under test in the test file.
+    7. IMPORTANT: Always pytest parameterize tests for different cases and only mock external services or APIs.
+    8. CRITICAL: Your response should ONLY contain the code blocks and `uv add package_names` command at the end after all the code blocks. Do not include any explanations or additional text.
+    {entry_point_rule}
+Working directory: {working_dir}
+"""
+
+ENTRY_POINT_RULE = "9. CRITICAL: Create a main method to run the app in main.py and if a web app run the app on the port given by the PORT environment variable (default 8080); tests that start the server must read the same variable."
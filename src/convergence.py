@@ -0,0 +1,125 @@
+import os
+import re
+import ast
+import hashlib
+import difflib
+from typing import List, Tuple
+
+from file_utils import extract_file_contents, extract_patch_blocks
+
+CONTINUE = "continue"
+SWITCH = "switch"
+STOP = "stop"
+
+
+def collapse_whitespace(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def normalize_code(content: str) -> str:
+    # The AST ignores comments, blank lines and formatting, so reworded-but-equal code compares equal
+    try:
+        return ast.dump(ast.parse(content))
+    except SyntaxError:
+        return collapse_whitespace(content)
+
+
+def read_project_file(project_dir: str, file_path: str) -> str:
+    try:
+        with open(os.path.join(project_dir, file_path), "r") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def changed_lines(before: str, after: str) -> List[str]:
+    """The added and removed lines of a diff, whitespace-normalized and without context."""
+    diff = difflib.unified_diff(before.splitlines(), after.splitlines(), lineterm="", n=0)
+    return [line[0] + collapse_whitespace(line[1:]) for line in diff
+            if line[:1] in "+-" and not line.startswith(("+++", "---")) and line[1:].strip()]
+
+
+def suggestion_edits(suggestion: str, project_dir: str) -> Tuple[List[str], List[str]]:
+    """Describe a suggestion by what it changes: (changed lines, normalized code of the files it writes).
+
+    Comparing edits rather than whole files keeps a small fix to a large file from looking like
+    every other suggestion for that file.
+    """
+    files = extract_file_contents(suggestion)
+    patches = extract_patch_blocks(suggestion)
+    if not files and not patches:
+        return [collapse_whitespace(suggestion)], []
+    edits, results = [], []
+    for path, content in sorted(files.items()):
+        before = read_project_file(project_dir, path) if project_dir else ""
+        edits += [f"{path}:{line}" for line in changed_lines(before, content)]
+        results.append(f"{path}\0{normalize_code(content)}")
+    edits += [f"patch:{path}:{collapse_whitespace(patch)}" for path, patch in sorted(patches.items())]
+    return edits, results
+
+
+class ConvergenceController:
+    """Tracks the pylint/complexipy trajectory of the improvement loop and decides when to give up.
+
+    After ``patience`` attempts without a meaningful gain (or with a near-duplicate suggestion)
+    the controller asks for one strategy switch; if that stalls as well, it says stop.
+    """
+
+    def __init__(self, patience: int = 1, min_pylint_gain: float = 0.25, min_complexity_drop: int = 1,
+                 similarity_threshold: float = 0.95, min_fuzzy_lines: int = 5):
+        self.patience = patience
+        self.min_pylint_gain = min_pylint_gain
+        self.min_complexity_drop = min_complexity_drop
+        self.similarity_threshold = similarity_threshold
+        self.min_fuzzy_lines = min_fuzzy_lines
+        self.trajectory: List[Tuple[float, int]] = []
+        self.suggestions = []
+        self.hashes = set()
+        self.stalled = 0
+        self.switched = False
+
+    def is_duplicate(self, suggestion: str, project_dir: str = None) -> bool:
+        """Check ``suggestion`` against every earlier one and remember it.
+
+        A suggestion repeats an earlier one when it produces the same code (compared by AST) or
+        makes the same edit. Edits of at least ``min_fuzzy_lines`` changed lines also count as
+        repeats when they are ``similarity_threshold`` similar; smaller ones must match exactly.
+        """
+        edits, results = suggestion_edits(suggestion, project_dir)
+        if not edits:
+            # Writes the files exactly as they already are
+            return True
+        edit_text = "\n".join(edits)
+        digests = {hashlib.sha256(text.encode("utf-8")).hexdigest()
+                   for text in (edit_text, "\n".join(results)) if text}
+        if digests & self.hashes:
+            return True
+        self.hashes |= digests
+        if len(edits) >= self.min_fuzzy_lines:
+            for previous in self.suggestions:
+                matcher = difflib.SequenceMatcher(None, previous, edit_text)
+                # quick_ratio is an upper bound on ratio, so most distinct edits never pay for the full diff
+                if matcher.quick_ratio() >= self.similarity_threshold and matcher.ratio() >= self.similarity_threshold:
+                    self.suggestions.append(edit_text)
+                    return True
+            self.suggestions.append(edit_text)
+        return False
+
+    def improved(self, pylint_score: float, complexipy_score: int) -> bool:
+        if not self.trajectory:
+            return True
+        previous_pylint, previous_complexity = self.trajectory[-1]
+        return (pylint_score - previous_pylint >= self.min_pylint_gain
+                or previous_complexity - complexipy_score >= self.min_complexity_drop)
+
+    def record(self, pylint_score: float, complexipy_score: int, duplicate: bool = False) -> str:
+        improved = not duplicate and self.improved(pylint_score, complexipy_score)
+        self.trajectory.append((pylint_score, complexipy_score))
+        self.stalled = 0 if improved else self.stalled + 1
+        if self.stalled < self.patience:
+            return CONTINUE
+        if not self.switched:
+            self.switched = True
+            self.stalled = 0
+            return SWITCH
+        return STOP
@@ -0,0 +1,103 @@
+import os
+import re
+import sys
+import time
+import shlex
+import logging
+import subprocess
+from typing import List, Set, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+logger = logging.getLogger(__name__)
+
+# uv add options that consume the following token as their value
+UV_ADD_VALUE_OPTIONS = {
+    "--group", "--optional", "--extra", "-r", "--requirements", "--index", "--index-url",
+    "--default-index", "--extra-index-url", "--python", "-p", "--package", "--tag", "--branch", "--rev",
+}
+
+
+def normalize_package_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_name(spec: str) -> str:
+    match = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)", spec)
+    return normalize_package_name(match.group(1)) if match else ""
+
+
+def parse_uv_add_commands(text: str) -> List[str]:
+    packages = []
+    for line in text.split("\n"):
+        line = line.strip().strip("`").strip(".").strip()
+        if not line.startswith("uv add"):
+            continue
+        try:
+            tokens = shlex.split(line[len("uv add"):])
+        except ValueError:
+            tokens = line[len("uv add"):].split()
+
+        skip_next = False
+        for token in tokens:
+            if skip_next:
+                skip_next = False
+            elif token in UV_ADD_VALUE_OPTIONS:
+                skip_next = True
+            elif not token.startswith("-") and token not in packages:
+                packages.append(token)
+    return packages
+
+
+def declared_dependencies(project_dir: str) -> Set[str]:
+    names = set()
+    pyproject_path = os.path.join(project_dir, "pyproject.toml")
+    if os.path.exists(pyproject_path):
+        with open(pyproject_path, "rb") as f:
+            pyproject = tomllib.load(f)
+        specs = list(pyproject.get("project", {}).get("dependencies", []))
+        for group in pyproject.get("dependency-groups", {}).values():
+            specs.extend(spec for spec in group if isinstance(spec, str))
+        specs.extend(pyproject.get("tool", {}).get("uv", {}).get("dev-dependencies", []))
+        names.update(requirement_name(spec) for spec in specs)
+
+    lock_path = os.path.join(project_dir, "uv.lock")
+    if os.path.exists(lock_path):
+        with open(lock_path, "rb") as f:
+            lock = tomllib.load(f)
+        names.update(normalize_package_name(package["name"]) for package in lock.get("package", []))
+    return names
+
+
+def missing_dependencies(packages: List[str], project_dir: str) -> List[str]:
+    installed = declared_dependencies(project_dir)
+    stdlib = {normalize_package_name(name) for name in getattr(sys, "stdlib_module_names", ())}
+    missing = []
+    for spec in packages:
+        name = requirement_name(spec)
+        if not name or name in installed or name in stdlib:
+            continue
+        installed.add(name)
+        missing.append(spec)
+    return missing
+
+
+def install_dependencies(packages: List[str], project_dir: str, timeout: float = None) -> Tuple[bool, float]:
+    start = time.perf_counter()
+    if not packages:
+        return True, 0.0
+    command = ["uv", "add"] + packages
+    logger.info(f"Installing dependencies in one resolver call: {' '.join(packages)}")
+    try:
+        subprocess.run(command, check=True, cwd=project_dir, capture_output=True, text=True, timeout=timeout)
+        success = True
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Failed to install dependencies {packages}: {e.stderr}")
+        success = False
+    except subprocess.TimeoutExpired:
+        logger.error(f"Dependency installation timed out after {timeout}s")
+        success = False
+    return success, time.perf_counter() - start
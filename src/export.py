@@ -0,0 +1,127 @@
+import os
+import time
+import tarfile
+import zipfile
+import fnmatch
+import logging
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXCLUDES = [
+    ".venv", "venv", "__pycache__", "*.pyc", ".pytest_cache", ".pytest_reports", ".mypy_cache", ".ruff_cache",
+    ".git", ".coverage", ".coverage.*", "uv.lock",
+]
+# Members that are already compressed gain nothing from another deflate pass
+STORED_SUFFIXES = (".zip", ".gz", ".bz2", ".xz", ".zst", ".whl", ".png", ".jpg", ".jpeg", ".gif", ".webp")
+ARCHIVE_FORMATS = {".zip": "zip", ".tar.gz": "tar.gz", ".tgz": "tar.gz", ".tar.zst": "tar.zst"}
+
+
+class ExportError(Exception):
+    pass
+
+
+@dataclass
+class ExportReport:
+    archive_path: str
+    files: int
+    source_bytes: int
+    archive_bytes: int
+    seconds: float
+
+    def format(self) -> str:
+        return (f"{self.files} files, {self.source_bytes / 1024:.1f} KiB -> {self.archive_bytes / 1024:.1f} KiB "
+                f"in {self.seconds:.2f}s")
+
+
+def archive_format(archive_path: str) -> str:
+    for suffix, name in ARCHIVE_FORMATS.items():
+        if archive_path.endswith(suffix):
+            return name
+    raise ExportError(f"Unsupported archive type for {archive_path}; use one of {', '.join(ARCHIVE_FORMATS)}")
+
+
+def _matches(rel_path: str, patterns: List[str]) -> bool:
+    name = os.path.basename(rel_path)
+    return any(fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def iter_project_files(project_dir: str, exclude: List[str] = None,
+                       include: List[str] = None) -> Iterator[Tuple[str, str]]:
+    """Yield (path, archive name) for every file to export; ``include`` overrides ``exclude``."""
+    exclude = DEFAULT_EXCLUDES if exclude is None else exclude
+    include = include or []
+    for root, dirs, files in os.walk(project_dir):
+        rel_root = os.path.relpath(root, project_dir)
+        # Prune excluded directories so their contents (e.g. a whole .venv) are never even listed
+        dirs[:] = sorted(d for d in dirs
+                         if not _matches(os.path.normpath(os.path.join(rel_root, d)).replace(os.sep, "/"), exclude)
+                         or _matches(d, include))
+        for name in sorted(files):
+            arcname = os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, "/")
+            if _matches(arcname, include) or not _matches(arcname, exclude):
+                yield os.path.join(root, name), arcname
+
+
+def _write_zip(archive_path: str, members, compress_level: int) -> None:
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED, compresslevel=compress_level) as zipf:
+        for path, arcname in members:
+            compression = zipfile.ZIP_STORED if arcname.lower().endswith(STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+            zipf.write(path, arcname, compress_type=compression)
+
+
+def _write_tar(archive_path: str, members, archive_type: str, compress_level: int) -> None:
+    if archive_type == "tar.gz":
+        with tarfile.open(archive_path, "w:gz", compresslevel=compress_level) as tar:
+            for path, arcname in members:
+                tar.add(path, arcname, recursive=False)
+        return
+
+    if zstandard is None:
+        raise ExportError("tar.zst export needs the zstandard package (pip install zstandard)")
+    # threads=-1 spreads zstd compression over every core while tar streams members through it
+    compressor = zstandard.ZstdCompressor(level=compress_level, threads=-1)
+    with open(archive_path, "wb") as raw, compressor.stream_writer(raw) as stream, \
+            tarfile.open(fileobj=stream, mode="w|") as tar:
+        for path, arcname in members:
+            tar.add(path, arcname, recursive=False)
+
+
+def export_options(config: dict) -> dict:
+    return dict(
+        exclude=config.get('export_exclude'),
+        include=config.get('export_include'),
+        compress_level=config.get('export_compress_level')
+    )
+
+
+def export_project(project_dir: str, archive_path: str, exclude: List[str] = None, include: List[str] = None,
+                   compress_level: int = None) -> ExportReport:
+    archive_type = archive_format(archive_path)
+    start = time.perf_counter()
+    counts = {"files": 0, "bytes": 0}
+
+    def members():
+        for path, arcname in iter_project_files(project_dir, exclude, include):
+            counts["files"] += 1
+            counts["bytes"] += os.path.getsize(path)
+            yield path, arcname
+
+    os.makedirs(os.path.dirname(os.path.abspath(archive_path)), exist_ok=True)
+    if archive_type == "zip":
+        _write_zip(archive_path, members(), 1 if compress_level is None else compress_level)
+    elif archive_type == "tar.gz":
+        _write_tar(archive_path, members(), archive_type, 1 if compress_level is None else compress_level)
+    else:
+        _write_tar(archive_path, members(), archive_type, 3 if compress_level is None else compress_level)
+
+    report = ExportReport(archive_path, counts["files"], counts["bytes"], os.path.getsize(archive_path),
+                          time.perf_counter() - start)
+    logger.info(f"Exported {project_dir} to {archive_path}: {report.format()}")
+    return report
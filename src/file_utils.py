@@ -2,86 +2,177 @@ import os
 import re
 import ast
 import time
+import shutil
+import hashlib
 import logging
-from contextlib import contextmanager
+import tempfile
+from contextlib import contextmanager, ExitStack
+from typing import Dict
 
-import pywintypes
-import win32file
-import win32con
-import winerror
+from constants import FILE_CONTENT_PATTERN, PATCH_BLOCK_PREFIX, SEARCH_REPLACE_PATTERN
 
-from constants import FILE_CONTENT_PATTERN
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
 
 logger = logging.getLogger(__name__)
 
+LOCK_DIR = os.path.join(tempfile.gettempdir(), "coder_ai_agent_locks")
 
 
-@contextmanager
-def file_lock(self, file_path, timeout=30):
-    lock_path = f"{file_path}.lock"
-    file_handle = None
-    start_time = time.time()
+def _lock_path(file_path: str) -> str:
+    # Lock files live outside the project so they never end up in generated output
+    digest = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(LOCK_DIR, f"{digest}.lock")
+
+
+def _acquire(lock_file) -> None:
+    # Both calls block in the kernel/CRT until the lock is free, so there is no sleep loop here
+    if os.name == "nt":
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+
+
+def _release(lock_file) -> None:
+    if os.name == "nt":
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
 
+
+def _is_current(lock_file, lock_path: str) -> bool:
+    try:
+        current = os.stat(lock_path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(lock_file.fileno())
+    return (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino)
+
+
+@contextmanager
+def file_lock(file_path: str):
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    lock_path = _lock_path(file_path)
     while True:
+        lock_file = open(lock_path, "a+")
         try:
-            # Open the lock file
-            file_handle = win32file.CreateFile(
-                lock_path,
-                win32con.GENERIC_READ | win32con.GENERIC_WRITE,
-                win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE,
-                None,
-                win32con.OPEN_ALWAYS,
-                win32con.FILE_ATTRIBUTE_NORMAL,
-                None
-            )
-
-            # Create an OVERLAPPED structure
-            overlapped = pywintypes.OVERLAPPED()
-
-            # Attempt to acquire the lock
-            win32file.LockFileEx(file_handle, win32con.LOCKFILE_EXCLUSIVE_LOCK, 0, -0x10000, overlapped)
-
-            self.logger.info(f"Lock acquired for file: {file_path}")
-            yield
-            break  # Lock acquired successfully, exit the loop
+            _acquire(lock_file)
+        except BaseException:
+            lock_file.close()
+            raise
+        # The previous holder deletes the lock file on release; if we locked a deleted file, start over
+        if os.name == "nt" or _is_current(lock_file, lock_path):
+            break
+        _release(lock_file)
+        lock_file.close()
+    try:
+        yield
+    finally:
+        # Removed while still held (POSIX) so that waiters notice and re-open a fresh lock file
+        if os.name != "nt":
+            _remove_quietly(lock_path)
+        _release(lock_file)
+        lock_file.close()
+        if os.name == "nt":
+            # Fails harmlessly while another process still has it open
+            _remove_quietly(lock_path)
 
-        except Exception as e:
-            if e.winerror == winerror.ERROR_LOCK_VIOLATION:
-                if time.time() - start_time > timeout:
-                    self.logger.error(f"Timeout waiting for lock on file: {file_path}")
-                    raise Exception("Timeout waiting for file lock")
-                time.sleep(0.1)  # Wait a bit before retrying
-            else:
-                self.logger.error(f"Unexpected error while acquiring lock for file {file_path}: {str(e)}")
-                raise
-        finally:
-            if file_handle:
-                try:
-                    # Release the lock
-                    win32file.UnlockFileEx(file_handle, 0, -0x10000, overlapped)
-                    self.logger.info(f"Lock released for file: {file_path}")
-                except pywintypes.error as e:
-                    self.logger.error(f"Error releasing lock for file {file_path}: {str(e)}")
-                finally:
-                    win32file.CloseHandle(file_handle)
-
-        # Remove the lock file
+
+def _write_temp_file(file_path: str, content: str) -> str:
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        # mkstemp creates 0600 files; keep the permissions a plain open() would have produced
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+    return tmp_path
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def atomic_write_file(file_path: str, content: str) -> None:
+    tmp_path = _write_temp_file(file_path, content)
+    try:
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+
+
+def _backup(file_path: str) -> str:
+    """Keep the current version of ``file_path`` next to it (a hard link when possible); None if it is new."""
+    if not os.path.exists(file_path):
+        return None
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, backup_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".bak")
+    os.close(fd)
+    os.remove(backup_path)
+    try:
+        os.link(file_path, backup_path)
+    except OSError:
+        shutil.copy2(file_path, backup_path)
+    return backup_path
+
+
+def write_files_atomically(files: Dict[str, str]) -> None:
+    """Write several files as one transaction: either every file is replaced or none is.
+
+    If replacing a file fails, the files already replaced are restored from backups (or removed
+    when they did not exist before).
+    """
+    tmp_paths, backups, replaced = {}, {}, []
+    with ExitStack() as stack:
+        # Sorted lock order prevents deadlocks between concurrent writers of overlapping file sets
+        for file_path in sorted(files):
+            stack.enter_context(file_lock(file_path))
         try:
-            os.remove(lock_path)
-            self.logger.info(f"Lock file removed: {lock_path}")
-        except OSError as e:
-            self.logger.warning(f"Failed to remove lock file {lock_path}: {str(e)}")
+            for file_path, content in files.items():
+                tmp_paths[file_path] = _write_temp_file(file_path, content)
+                backups[file_path] = _backup(file_path)
+            for file_path, tmp_path in tmp_paths.items():
+                os.replace(tmp_path, file_path)
+                replaced.append(file_path)
+        except BaseException:
+            for file_path in replaced:
+                if backups[file_path] is not None:
+                    os.replace(backups.pop(file_path), file_path)
+                else:
+                    _remove_quietly(file_path)
+            for tmp_path in tmp_paths.values():
+                _remove_quietly(tmp_path)
+            raise
+        finally:
+            for backup_path in backups.values():
+                if backup_path is not None:
+                    _remove_quietly(backup_path)
+
 
 def robust_write_file(file_path: str, content: str, max_attempts: int, retry_delay: int) -> bool:
     logger.info(f"Attempting to write to file: {file_path}")
     for attempt in range(max_attempts):
         try:
             with file_lock(file_path):
-                with open(file_path, "w") as f:
-                    f.write(content)
-                logger.info(f"Successfully wrote to file: {file_path}")
-                return True
-        except IOError as e:
+                atomic_write_file(file_path, content)
+            logger.info(f"Successfully wrote to file: {file_path}")
+            return True
+        except OSError as e:
             logger.error(f"IOError writing to {file_path}: {e}")
             if attempt < max_attempts - 1:
                 logger.info(f"Retrying in {retry_delay} seconds...")
@@ -97,9 +188,215 @@ def extract_file_contents(solution: str) -> dict:
     file_contents = {}
     matches = re.findall(FILE_CONTENT_PATTERN, solution, re.DOTALL)
     for filename, content in matches:
+        if filename.strip().startswith(PATCH_BLOCK_PREFIX):
+            continue
         file_contents[filename.strip()] = content.strip()
     return file_contents
 
+
+def extract_patch_blocks(solution: str) -> dict:
+    patches = {}
+    for filename, content in re.findall(FILE_CONTENT_PATTERN, solution, re.DOTALL):
+        filename = filename.strip()
+        if filename.startswith(PATCH_BLOCK_PREFIX):
+            file_path = filename[len(PATCH_BLOCK_PREFIX):].strip()
+            patches[file_path] = patches.get(file_path, "") + content + "\n"
+    return patches
+
+
+class PatchConflictError(Exception):
+    pass
+
+
+def _find_lines(lines: list, search_lines: list) -> int:
+    # Tolerate trailing whitespace differences, which models introduce constantly
+    stripped = [line.rstrip() for line in lines]
+    target = [line.rstrip() for line in search_lines]
+    matches = [index for index in range(len(stripped) - len(target) + 1)
+               if stripped[index:index + len(target)] == target]
+    if len(matches) != 1:
+        return -1
+    return matches[0]
+
+
+def apply_search_replace(original: str, patch: str) -> str:
+    edits = re.findall(SEARCH_REPLACE_PATTERN, patch, re.DOTALL)
+    if not edits:
+        raise PatchConflictError("Patch block contains no SEARCH/REPLACE edits")
+
+    content = original
+    for search, replace in edits:
+        if not search.strip():
+            if content.strip():
+                raise PatchConflictError("Empty SEARCH section for a non-empty file")
+            content = replace
+            continue
+        occurrences = content.count(search)
+        if occurrences == 1:
+            content = content.replace(search, replace, 1)
+            continue
+        if occurrences > 1:
+            raise PatchConflictError(f"SEARCH section is ambiguous ({occurrences} matches):\n{search}")
+
+        lines = content.split("\n")
+        search_lines = search.split("\n")
+        index = _find_lines(lines, search_lines)
+        if index == -1:
+            raise PatchConflictError(f"SEARCH section not found in file:\n{search}")
+        lines[index:index + len(search_lines)] = replace.split("\n")
+        content = "\n".join(lines)
+    return content
+
+
+def resolve_file_changes(solution: str, cwd: str):
+    """Turn a response into final file contents, applying patch blocks to the files in cwd.
+
+    A full-file block always wins over a patch for the same path. Returns the resolved
+    contents and the paths whose patches could not be applied.
+    """
+    file_contents = extract_file_contents(solution)
+    conflicts = []
+    for file_path, patch in extract_patch_blocks(solution).items():
+        if file_path in file_contents:
+            continue
+        full_path = os.path.join(cwd, file_path)
+        original = ""
+        if os.path.exists(full_path):
+            with open(full_path, "r") as f:
+                original = f.read()
+        try:
+            file_contents[file_path] = apply_search_replace(original, patch).strip()
+        except PatchConflictError as e:
+            logger.warning(f"Patch for {file_path} does not apply: {e}")
+            conflicts.append(file_path)
+    return file_contents, conflicts
+
+class StreamingFileParser:
+    """Incremental parser for the <<<file>>> ... <<<end>>> block protocol.
+
+    Chunks are fed as they arrive from the LLM and each file block is returned as soon
+    as its end marker is seen. Chunks are kept in lists and only joined once per block.
+    """
+
+    END_MARKER = "<<<end>>>"
+    HEADER_PATTERN = re.compile(r"<<<([^\n]+?)>>>\n")
+
+    def __init__(self):
+        self.chunks = []
+        self.outside_parts = []
+        self._outside = ""
+        self._file_name = None
+        self._block_parts = []
+        self._block_window = ""
+
+    @property
+    def current_file(self):
+        return self._file_name
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    @property
+    def outside_text(self) -> str:
+        return "".join(self.outside_parts) + self._outside
+
+    def feed(self, chunk: str) -> list:
+        self.chunks.append(chunk)
+        completed = []
+        pending = chunk
+        while pending:
+            if self._file_name is None:
+                pending = self._feed_outside(pending)
+            else:
+                pending = self._feed_block(pending, completed)
+        return completed
+
+    def _feed_outside(self, chunk: str) -> str:
+        self._outside += chunk
+        match = self.HEADER_PATTERN.search(self._outside)
+        while match and match.group(1).strip() == "end":
+            match = self.HEADER_PATTERN.search(self._outside, match.end())
+        if not match:
+            # Everything before a possible partial header can be committed now
+            cut = self._outside.rfind("<<<")
+            if cut == -1:
+                cut = len(self._outside.rstrip("<"))
+            self.outside_parts.append(self._outside[:cut])
+            self._outside = self._outside[cut:]
+            return ""
+
+        self.outside_parts.append(self._outside[:match.start()])
+        rest = self._outside[match.end():]
+        self._outside = ""
+        self._file_name = match.group(1).strip()
+        self._block_parts = []
+        self._block_window = ""
+        return rest
+
+    def _feed_block(self, chunk: str, completed: list) -> str:
+        # Only the tail of the previous chunk is needed to spot an end marker split across chunks
+        window = self._block_window + chunk
+        position = window.find(self.END_MARKER)
+        if position == -1:
+            self._block_parts.append(chunk)
+            self._block_window = window[-(len(self.END_MARKER) - 1):]
+            return ""
+
+        chunk_position = position - len(self._block_window)
+        if chunk_position >= 0:
+            self._block_parts.append(chunk[:chunk_position])
+            content = "".join(self._block_parts)
+        else:
+            content = "".join(self._block_parts)[:chunk_position]
+        completed.append((self._file_name, content.strip()))
+        self._file_name = None
+        return chunk[chunk_position + len(self.END_MARKER):]
+
+
+class StreamValidationError(Exception):
+    pass
+
+
+class StreamValidator:
+    """Rejects a streaming response as soon as it breaks one of the implementation prompt rules."""
+
+    PASS_PATTERN = re.compile(r"(^|:)\s*pass\s*(#.*)?$")
+
+    def __init__(self, allowed_files=None, forbid_pass: bool = True, max_prose_lines: int = None):
+        self.allowed_files = set(allowed_files) if allowed_files else None
+        self.forbid_pass = forbid_pass
+        self.max_prose_lines = max_prose_lines
+        self.prose_lines = 0
+        self._line = ""
+        self._outside_seen = 0
+        self._outside_line = ""
+
+    def feed(self, chunk: str, parser: StreamingFileParser) -> None:
+        if self.allowed_files is not None and parser.current_file is not None \
+                and parser.current_file not in self.allowed_files:
+            raise StreamValidationError(f"Unexpected file in response: {parser.current_file}")
+
+        if self.forbid_pass:
+            lines = (self._line + chunk).split("\n")
+            self._line = lines.pop()
+            for line in lines:
+                if self.PASS_PATTERN.search(line.strip()):
+                    raise StreamValidationError(f"Forbidden pass statement: {line.strip()}")
+
+        if self.max_prose_lines is not None:
+            new_parts = parser.outside_parts[self._outside_seen:]
+            self._outside_seen = len(parser.outside_parts)
+            lines = (self._outside_line + "".join(new_parts)).split("\n")
+            self._outside_line = lines.pop()
+            for line in lines:
+                line = line.strip()
+                if line and not line.startswith("```") and not line.strip(".").startswith("uv add"):
+                    self.prose_lines += 1
+            if self.prose_lines > self.max_prose_lines:
+                raise StreamValidationError(f"Response contains {self.prose_lines} lines of prose outside code blocks")
+
+
 def validate_file_content(file_path: str, content: str) -> str:
     if file_path.endswith(".py"):
         content = clean_markdown_artifacts(content)
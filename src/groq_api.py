@@ -1,37 +1,71 @@
-import json
 import os
-import requests
-from typing import Generator
+import asyncio
+from typing import Iterator
 from dotenv import load_dotenv
+from groq import Groq, AsyncGroq, APIConnectionError, APIStatusError
+
+from llm_client import LLMClient
 
-import os
-from dotenv import load_dotenv
-from groq import Groq
 
-class GroqAPI:
-    def __init__(self, model: str):
+class GroqAPI(LLMClient):
+    provider = "groq"
+    display_name = "Groq"
+
+    def __init__(self, model: str, **client_options):
+        super().__init__(model, **client_options)
         load_dotenv()  # Load environment variables from .env file
         self.api_key = os.getenv("GROQ_API_KEY")
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not found in environment variables")
-        self.model = model
-        self.client = Groq(api_key=self.api_key)
+        # Retries are handled by LLMClient so they are consistent across providers
+        self.client = Groq(api_key=self.api_key, max_retries=0)
+        self._async_client = None
+        self._async_client_loop = None
 
-    def generate(self, prompt: str) -> str:
-        try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=self.model,
-                stream=True
-            )
+    def is_retriable(self, error: Exception) -> bool:
+        if isinstance(error, APIStatusError):
+            return error.status_code >= 500 or error.status_code == 429
+        return isinstance(error, APIConnectionError)
 
-            full_response = ""
+    def _stream(self, prompt: str, **options) -> Iterator[str]:
+        chat_completion = self.client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=self.model,
+            stream=True,
+            **options
+        )
+        try:
             for chunk in chat_completion:
                 content = chunk.choices[0].delta.content
                 if content is not None:
-                    full_response += content
-                    print(content, end="", flush=True)
-            print()  # Print a newline at the end
-            return full_response
-        except Exception as e:
-            raise Exception(f"Groq API error: {str(e)}")
\ No newline at end of file
+                    yield content
+        finally:
+            chat_completion.close()
+
+    def _get_async_client(self) -> AsyncGroq:
+        # The async client pools connections on one event loop, so rebuild it when the loop changes
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = AsyncGroq(api_key=self.api_key, max_retries=0)
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def _agenerate(self, prompt: str, **options) -> str:
+        chat_completion = await self._get_async_client().chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=self.model,
+            stream=True,
+            **options
+        )
+
+        chunks = []
+        async for chunk in chat_completion:
+            content = chunk.choices[0].delta.content
+            if content is not None:
+                chunks.append(content)
+        return "".join(chunks)
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
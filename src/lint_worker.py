@@ -0,0 +1,114 @@
+"""Long-lived quality tool worker.
+
+Runs inside the generated project's virtual environment (``uv run python lint_worker.py``)
+and keeps autopep8, pylint and complexipy imported between requests. Requests and
+responses are exchanged as one JSON object per line over stdin/stdout.
+
+This script must only depend on the standard library and the project's dev tools,
+since it does not run with the agent's interpreter.
+"""
+import io
+import os
+import sys
+import json
+import contextlib
+import traceback
+
+
+def run_autopep8(path: str, args: list) -> dict:
+    import autopep8
+
+    options = autopep8.parse_args(args + [path], apply_config=True)
+    autopep8.fix_file(path, options=options)
+    return {}
+
+
+def run_pylint(path: str, args: list) -> dict:
+    from astroid import MANAGER
+    from pylint.lint import Run
+    from pylint.reporters import CollectingReporter
+
+    # astroid caches parsed modules per process; drop them so edited files are re-read
+    MANAGER.clear_cache()
+    reporter = CollectingReporter()
+    try:
+        run = Run(args + [path], reporter=reporter, exit=False)
+    except SystemExit:
+        run = None
+
+    score = 0.0
+    if run is not None:
+        stats = run.linter.stats
+        score = getattr(stats, "global_note", None)
+        if score is None and isinstance(stats, dict):
+            score = stats.get("global_note")
+        score = float(score or 0.0)
+
+    messages = [
+        {
+            "path": message.path,
+            "line": message.line,
+            "column": message.column,
+            "msg_id": message.msg_id,
+            "symbol": message.symbol,
+            "message": message.msg,
+        }
+        for message in reporter.messages
+    ]
+    return {"score": score, "messages": messages}
+
+
+def run_complexipy(path: str, args: list) -> dict:
+    try:
+        from complexipy import file_complexity
+        result = file_complexity(path)
+    except ImportError:
+        from complexipy import rust
+        result = rust.file_complexity(path, os.getcwd())
+
+    functions = [
+        {
+            "name": function.name,
+            "complexity": function.complexity,
+            "line_start": getattr(function, "line_start", None),
+            "line_end": getattr(function, "line_end", None),
+        }
+        for function in result.functions
+    ]
+    return {"path": path, "score": result.complexity, "functions": functions}
+
+
+TOOLS = {
+    "autopep8": run_autopep8,
+    "pylint": run_pylint,
+    "complexipy": run_complexipy,
+}
+
+
+def main() -> None:
+    # Keep a private copy of fd 1 for the protocol and point fd 1 at stderr, so output written
+    # below Python (C extensions, Rust, child processes) cannot corrupt the response stream
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        response = {"id": request.get("id")}
+        captured = io.StringIO()
+        try:
+            # Tools print progress and reports; keep them off the protocol stream
+            with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+                response["result"] = TOOLS[request["tool"]](request["path"], request.get("args", []))
+            response["ok"] = True
+        except Exception:
+            response["ok"] = False
+            response["error"] = traceback.format_exc()
+        response["log"] = captured.getvalue()
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
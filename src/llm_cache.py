@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import itertools
+import tempfile
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CachedText(str):
+    """A response served from the cache; lets callers tell hits from real provider latency."""
+
+    cached = True
+
+
+class ResponseCache:
+    """On-disk, content-addressed store of LLM responses with TTL and size-based eviction."""
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl: float, evict_every: int = 50):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evict_every = max(evict_every, 1)
+        self._puts = itertools.count()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, params: dict) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        material = json.dumps([provider, model, prompt_hash, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self.ttl and time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            return None
+
+        # Touch the entry so eviction is least-recently-used rather than oldest-first
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("response")
+
+    def put(self, key: str, response: str, **metadata) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = dict(metadata, created=time.time(), response=response)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write LLM cache entry {key}: {e}")
+            self._remove(tmp_path)
+            return
+        # Eviction walks the whole cache directory, so it runs on the first put and every evict_every after that
+        if next(self._puts) % self.evict_every == 0:
+            self.evict()
+
+    def discard(self, key: str) -> None:
+        self._remove(self._path(key))
+
+    def evict(self) -> None:
+        entries = []
+        total_size = 0
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self.ttl and now - stat.st_mtime > self.ttl:
+                    self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        if not self.max_bytes or total_size <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class CachedLLM:
+    """Read-through/write-through wrapper around any provider exposing generate(prompt, **options).
+
+    ``cache_nonce`` is folded into the key and not sent to the provider, so a retry of the same
+    prompt asks the model again instead of replaying the answer that just failed. Callers that
+    reject a response call ``forget`` so it is not served again.
+    """
+
+    def __init__(self, llm, cache: ResponseCache):
+        self.llm = llm
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def provider(self) -> str:
+        return getattr(self.llm, "provider", type(self.llm).__name__)
+
+    @property
+    def model(self) -> str:
+        return self.llm.model
+
+    def key(self, prompt: str, cache_nonce, options: dict) -> str:
+        params = dict(options, cache_nonce=cache_nonce) if cache_nonce is not None else options
+        return self.cache.make_key(self.provider, self.model, prompt, params)
+
+    def forget(self, prompt: str, cache_nonce=None, **options) -> None:
+        self.cache.discard(self.key(prompt, cache_nonce, options))
+
+    def generate(self, prompt: str, cache_nonce=None, **options) -> str:
+        key = self.key(prompt, cache_nonce, options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.info(f"LLM cache hit ({self.provider}/{self.model})")
+            return CachedText(cached)
+
+        self.misses += 1
+        response = self.llm.generate(prompt, **options)
+        self.cache.put(key, response, provider=self.provider, model=self.model)
+        return response
+
+    def stream(self, prompt: str, cache_nonce=None, **options) -> Iterator[str]:
+        key = self.key(prompt, cache_nonce, options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.info(f"LLM cache hit ({self.provider}/{self.model})")
+            yield CachedText(cached)
+            return
+
+        self.misses += 1
+        chunks = []
+        for chunk in self.llm.stream(prompt, **options):
+            chunks.append(chunk)
+            yield chunk
+        # Reached only when the stream ran to completion, so partial responses are never cached
+        self.cache.put(key, "".join(chunks), provider=self.provider, model=self.model)
+
+    async def agenerate(self, prompt: str, cache_nonce=None, **options) -> str:
+        key = self.key(prompt, cache_nonce, options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.info(f"LLM cache hit ({self.provider}/{self.model})")
+            return CachedText(cached)
+
+        self.misses += 1
+        response = await self.llm.agenerate(prompt, **options)
+        self.cache.put(key, response, provider=self.provider, model=self.model)
+        return response
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
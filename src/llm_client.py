@@ -0,0 +1,99 @@
+import abc
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMClient(abc.ABC):
+    """Base class for LLM providers.
+
+    Subclasses implement ``_stream`` and ``_agenerate``; this class adds retries with
+    exponential backoff and full jitter, and caps concurrent requests per client.
+    Subclasses holding an async client close it in ``aclose``.
+    """
+
+    provider = None
+    display_name = "LLM"
+
+    def __init__(self, model: str, max_in_flight: int = 4, max_retries: int = 3,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0):
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = None
+        self._semaphore_loop = None
+        self._sync_slots = threading.BoundedSemaphore(max_in_flight)
+
+    @abc.abstractmethod
+    def _stream(self, prompt: str, **options) -> Iterator[str]:
+        pass
+
+    @abc.abstractmethod
+    async def _agenerate(self, prompt: str, **options) -> str:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    def is_retriable(self, error: Exception) -> bool:
+        return True
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def stream(self, prompt: str, cache_nonce=None, **options) -> Iterator[str]:
+        # cache_nonce only matters to CachedLLM; accepting it here lets callers pass it whether or not caching is on
+        with self._sync_slots:
+            for attempt in range(self.max_retries + 1):
+                started = False
+                try:
+                    for chunk in self._stream(prompt, **options):
+                        started = True
+                        yield chunk
+                    return
+                except Exception as e:
+                    # Once chunks have been handed out a retry would duplicate them, so only retry before that
+                    if started or attempt >= self.max_retries or not self.is_retriable(e):
+                        raise LLMError(f"{self.display_name} API error: {str(e)}") from e
+                    delay = self.backoff_delay(attempt)
+                    logger.warning(f"{self.display_name} request failed ({e}); retrying in {delay:.1f}s")
+                    time.sleep(delay)
+
+    def generate(self, prompt: str, cache_nonce=None, **options) -> str:
+        chunks = []
+        for chunk in self.stream(prompt, **options):
+            chunks.append(chunk)
+            print(chunk, end="", flush=True)
+        print()  # Print a newline at the end
+        return "".join(chunks)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to a single event loop, so recreate them per loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def agenerate(self, prompt: str, cache_nonce=None, **options) -> str:
+        async with self._get_semaphore():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await self._agenerate(prompt, **options)
+                except Exception as e:
+                    if attempt >= self.max_retries or not self.is_retriable(e):
+                        raise LLMError(f"{self.display_name} API error: {str(e)}") from e
+                    delay = self.backoff_delay(attempt)
+                    logger.warning(f"{self.display_name} request failed ({e}); retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
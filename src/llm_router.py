@@ -0,0 +1,163 @@
+import time
+import logging
+import statistics
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from llm_client import LLMError
+
+logger = logging.getLogger(__name__)
+
+# Agent stages (the names used for tracing) mapped onto the route names in config.json
+STAGE_ROUTES = {
+    "plan": "planning",
+    "implement": "implementation",
+    "implement_module": "implementation",
+    "candidate": "implementation",
+    "improve": "improvement",
+    "patch_fallback": "improvement",
+    "validate": "validation",
+    "improve_tests": "test_repair",
+}
+
+
+class ProviderHealth:
+    """Rolling latency (time to first chunk) and error rate of one provider/model."""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def latency(self) -> Optional[float]:
+        with self._lock:
+            return statistics.median(self.latencies) if self.latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def success(self, latency: float = None) -> None:
+        with self._lock:
+            self.requests += 1
+            self.outcomes.append(True)
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def failure(self, cooldown: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.outcomes.append(False)
+            self.cooldown_until = time.monotonic() + cooldown
+
+
+class LLMRouter:
+    """Sends each stage to its configured chain of "provider:model" clients.
+
+    Clients are tried in the configured order, except that a client in cooldown after a
+    failure or above ``max_error_rate`` is moved to the back, and a client whose median
+    latency is more than ``latency_factor`` times the fastest healthy one gives way to it.
+    A failed request falls over to the next client as long as no chunk has been returned.
+    """
+
+    def __init__(self, clients: Dict[str, object], routes: Dict[str, List[str]], window: int = 20,
+                 cooldown: float = 60.0, max_error_rate: float = 0.5, latency_factor: float = 2.0):
+        self.clients = clients
+        self.routes = routes
+        self.cooldown = cooldown
+        self.max_error_rate = max_error_rate
+        self.latency_factor = latency_factor
+        self.health = {key: ProviderHealth(window) for key in clients}
+
+    def route(self, stage: str = None) -> List[str]:
+        keys = self.routes.get(STAGE_ROUTES.get(stage, stage)) or self.routes.get("default", [])
+        keys = [key for key in keys if key in self.clients]
+        return keys or list(self.clients)
+
+    def candidates(self, stage: str = None) -> List[str]:
+        now = time.monotonic()
+        keys = self.route(stage)
+        healthy = [key for key in keys
+                   if self.health[key].cooldown_until <= now and self.health[key].error_rate <= self.max_error_rate]
+        unhealthy = [key for key in keys if key not in healthy]
+
+        latencies = {key: self.health[key].latency for key in healthy}
+        measured = [key for key in healthy if latencies[key] is not None]
+        if measured and latencies[healthy[0]] is not None:
+            fastest = min(measured, key=latencies.get)
+            if latencies[healthy[0]] > self.latency_factor * latencies[fastest]:
+                healthy.remove(fastest)
+                healthy.insert(0, fastest)
+        # Unhealthy clients stay as a last resort rather than failing the stage outright
+        return healthy + unhealthy
+
+    def stream(self, prompt: str, stage: str = None, **options) -> Iterator[str]:
+        errors = []
+        for key in self.candidates(stage):
+            health = self.health[key]
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in self.clients[key].stream(prompt, **options):
+                    if not started:
+                        started = True
+                        # A cache hit says nothing about the provider's latency, only that it is usable
+                        health.success(None if getattr(chunk, "cached", False) else time.perf_counter() - start)
+                    yield chunk
+                if not started:
+                    health.success(time.perf_counter() - start)
+                return
+            except LLMError as e:
+                health.failure(self.cooldown)
+                # Part of the answer is already out; another model cannot continue it
+                if started:
+                    raise
+                logger.warning(f"{key} failed for stage {stage or 'default'}, failing over: {str(e)}")
+                errors.append(f"{key}: {str(e)}")
+        raise LLMError(f"All providers failed for stage {stage or 'default'}: {'; '.join(errors)}")
+
+    def generate(self, prompt: str, stage: str = None, **options) -> str:
+        chunks = []
+        for chunk in self.stream(prompt, stage, **options):
+            chunks.append(chunk)
+            print(chunk, end="", flush=True)
+        print()  # Print a newline at the end
+        return "".join(chunks)
+
+    async def agenerate(self, prompt: str, stage: str = None, **options) -> str:
+        errors = []
+        for key in self.candidates(stage):
+            try:
+                response = await self.clients[key].agenerate(prompt, **options)
+            except LLMError as e:
+                self.health[key].failure(self.cooldown)
+                logger.warning(f"{key} failed for stage {stage or 'default'}, failing over: {str(e)}")
+                errors.append(f"{key}: {str(e)}")
+                continue
+            # Whole-response timings are not comparable with time to first chunk, so only the outcome counts
+            self.health[key].success()
+            return response
+        raise LLMError(f"All providers failed for stage {stage or 'default'}: {'; '.join(errors)}")
+
+    def forget(self, prompt: str, stage: str = None, **options) -> None:
+        """Drop a rejected response from the cache of every client that could have served it."""
+        for key in self.route(stage):
+            forget = getattr(self.clients[key], "forget", None)
+            if forget is not None:
+                forget(prompt, **options)
+
+    async def aclose(self) -> None:
+        for client in self.clients.values():
+            aclose = getattr(client, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def stats(self) -> Dict[str, dict]:
+        return {key: {"requests": health.requests, "error_rate": round(health.error_rate, 3),
+                      "median_latency": health.latency}
+                for key, health in self.health.items() if health.requests}
@@ -2,46 +2,68 @@ import os
 import json
 import logging
 import click
-import zipfile
 import shutil
-from coder_ai_agent import CoderAIAgent
+from export import ExportError, archive_format, export_options, export_project
+
+
+def validate_archive_path(ctx, param, value):
+    # Reject an unsupported extension before the run, not after generating the whole project
+    if value is not None:
+        try:
+            archive_format(value)
+        except ExportError as e:
+            raise click.BadParameter(str(e))
+    return value
 
 
 @click.command()
 @click.argument("task", required=False)
 @click.option("--file", type=click.Path(exists=True), help="Path to a markdown file containing the task")
-@click.option("--model", default="mistral-nemo", help="The model to use for the LLM")
+@click.option("--model", help="The model to use for every stage, ahead of the routes in config.json")
 @click.option(
     "--provider",
-    default="ollama",
-    type=click.Choice(["ollama", "openai", "claude"]),
-    help="The LLM provider to use",
+    type=click.Choice(["ollama", "groq"]),
+    help="The LLM provider to use for every stage, ahead of the routes in config.json",
 )
 @click.option(
-    "--zip", type=click.Path(), help="Path to save the zip file of the agent run"
+    "--zip", type=click.Path(), callback=validate_archive_path,
+    help="Path to save the archive of the agent run (.zip, .tar.gz or .tar.zst)"
 )
+@click.option("--resume", help="Continue an interrupted run from its checkpoint (project name or checkpoint file)")
 def cli(
         task: str = None,
         file: str = None,
-        model: str = "mistral-nemo",
-        provider: str = "ollama",
+        model: str = None,
+        provider: str = None,
         zip: str = None,
+        resume: str = None,
 ):
     """
     Run Nemo Agent tasks to create Python projects using uv and pytest.
     If no task is provided, it will prompt the user for input.
     """
+    # Imported here so that `--help` and argument errors never pay for loading the agent
+    from coder_ai_agent import CoderAIAgent
+    from checkpoint import CheckpointError
+
     # Store the original working directory
     original_dir = os.getcwd()
+    config_overrides = {"llm_model": model, "llm_provider": provider}
 
-    # Read task from file if provided
-    if file:
-        with open(file, 'r') as f:
-            task = f.read().strip()
-    elif not task:
-        task = click.prompt("Please enter your task")
+    if resume:
+        try:
+            nemo_agent = CoderAIAgent.resume(resume, config_overrides)
+        except CheckpointError as e:
+            raise click.ClickException(str(e))
+    else:
+        # Read task from file if provided
+        if file:
+            with open(file, 'r') as f:
+                task = f.read().strip()
+        elif not task:
+            task = click.prompt("Please enter your task")
 
-    nemo_agent = CoderAIAgent(task=task)
+        nemo_agent = CoderAIAgent(task=task, config_overrides=config_overrides)
     nemo_agent.run_task()
 
     project_dir = nemo_agent.pwd
@@ -50,14 +72,11 @@ def cli(
         # Ensure the zip file is created in the original directory
         zip_path = os.path.join(original_dir, zip)
 
-        # Create a zip file
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(project_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, project_dir)
-                    zipf.write(file_path, arcname)
-        print(f"Project files have been zipped to: {zip_path}")
+        try:
+            report = export_project(project_dir, zip_path, **export_options(nemo_agent.config))
+        except ExportError as e:
+            raise click.ClickException(f"{e}; project files are kept in: {project_dir}")
+        print(f"Project files have been archived to: {zip_path} ({report.format()})")
 
         # Delete the project directory
         shutil.rmtree(project_dir)
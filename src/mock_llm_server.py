@@ -0,0 +1,172 @@
+import re
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+TOKEN_SPLIT_PATTERN = re.compile(r"\s*\S+|\s+")
+
+
+class ResponseBook:
+    """Recorded responses picked by the first entry whose ``match`` regex is found in the prompt.
+
+    An entry holds either one ``response`` or a list of ``responses`` that are replayed in order,
+    repeating the last one, so successive improvement rounds can get different answers.
+    """
+
+    def __init__(self, entries: list, default: str = ""):
+        self.entries = [dict(entry, pattern=re.compile(entry.get("match", ""), re.DOTALL)) for entry in entries]
+        self.default = default
+        self.served = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "ResponseBook":
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(data.get("responses", []), data.get("default", ""))
+
+    def reply(self, prompt: str) -> str:
+        for index, entry in enumerate(self.entries):
+            if entry["pattern"].search(prompt):
+                with self._lock:
+                    count = self.served.get(index, 0)
+                    self.served[index] = count + 1
+                responses = entry.get("responses") or [entry.get("response", "")]
+                return responses[min(count, len(responses) - 1)]
+        with self._lock:
+            self.served[None] = self.served.get(None, 0) + 1
+        return self.default
+
+    @property
+    def request_count(self) -> int:
+        return sum(self.served.values())
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _tokens(self, text: str):
+        delay = 1.0 / self.server.token_rate if self.server.token_rate else 0
+        for token in TOKEN_SPLIT_PATTERN.findall(text):
+            if delay:
+                time.sleep(delay)
+            yield token
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def do_POST(self):
+        body = self._read_json()
+        if self.path.rstrip("/").endswith("/api/generate"):
+            self._ollama_generate(body)
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat_completions(body)
+        else:
+            self.send_error(404)
+
+    def _ollama_generate(self, body: dict) -> None:
+        text = self.server.book.reply(body.get("prompt", ""))
+        self._start_stream("application/x-ndjson")
+        for token in self._tokens(text):
+            self._write_chunk(json.dumps({"model": body.get("model"), "response": token, "done": False}).encode() + b"\n")
+        self._write_chunk(json.dumps({"model": body.get("model"), "response": "", "done": True}).encode() + b"\n")
+        self._write_chunk(b"")
+
+    def _chat_completions(self, body: dict) -> None:
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        text = self.server.book.reply(prompt)
+        self._start_stream("text/event-stream")
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        event({"role": "assistant", "content": ""})
+        for token in self._tokens(text):
+            event({"content": token})
+        event({}, "stop")
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class MockLLMServer:
+    """Local stand-in for Ollama's /api/generate and Groq's OpenAI-compatible chat completions.
+
+    Point OllamaAPI at ``{url}/api`` and the Groq SDK at ``url`` (GROQ_BASE_URL).
+    ``token_rate`` throttles the replay to that many tokens per second; None streams at full speed.
+    """
+
+    def __init__(self, book: ResponseBook, token_rate: float = None, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), _MockHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.book = book
+        self.httpd.token_rate = token_rate
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+@click.command()
+@click.argument("responses_file", type=click.Path(exists=True))
+@click.option("--host", default="127.0.0.1", help="Interface to bind")
+@click.option("--port", default=11434, type=int, help="Port to listen on (Ollama's default)")
+@click.option("--token-rate", type=float, help="Tokens per second to replay at; unthrottled if omitted")
+def serve(responses_file: str, host: str, port: int, token_rate: float = None):
+    """
+    Serve recorded LLM responses over the Ollama and Groq streaming protocols.
+    """
+    server = MockLLMServer(ResponseBook.load(responses_file), token_rate, host, port)
+    print(f"Mock LLM server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    serve()
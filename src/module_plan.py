@@ -0,0 +1,106 @@
+import re
+import ast
+import sys
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+MODULE_NAME_PATTERN = re.compile(r"^[a-z_][a-z0-9_]*$")
+# Module names that would shadow the standard library or the test tooling inside the project
+RESERVED_MODULE_NAMES = set(getattr(sys, "stdlib_module_names", ())) | {"tests", "conftest", "pytest", "setup"}
+
+
+class ModulePlanError(Exception):
+    pass
+
+
+@dataclass
+class ModuleSpec:
+    name: str
+    description: str = ""
+    depends_on: List[str] = field(default_factory=list)
+
+    @property
+    def file_path(self) -> str:
+        return f"{self.name}.py"
+
+    @property
+    def test_path(self) -> str:
+        return f"tests/test_{self.name}.py"
+
+
+def parse_module_plan(response: str, max_modules: int) -> List[ModuleSpec]:
+    start, end = response.find("{"), response.rfind("}")
+    if start == -1 or end <= start:
+        raise ModulePlanError("The plan contains no JSON object")
+    try:
+        entries = json.loads(response[start:end + 1])["modules"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ModulePlanError(f"The plan is not valid JSON: {e}") from e
+
+    modules: Dict[str, ModuleSpec] = {}
+    for entry in entries:
+        name = str(entry.get("name", "")).strip().removesuffix(".py")
+        if not MODULE_NAME_PATTERN.match(name) or name in RESERVED_MODULE_NAMES:
+            raise ModulePlanError(f"Unusable module name in plan: {name!r}")
+        modules[name] = ModuleSpec(name, str(entry.get("description", "")), list(entry.get("depends_on") or []))
+    if "main" not in modules:
+        modules["main"] = ModuleSpec("main", "Entry point wiring the other modules together",
+                                     [name for name in modules])
+    if len(modules) > max_modules:
+        raise ModulePlanError(f"The plan has {len(modules)} modules, more than the limit of {max_modules}")
+
+    for spec in modules.values():
+        spec.depends_on = [dep.removesuffix(".py") for dep in spec.depends_on
+                           if dep.removesuffix(".py") in modules and dep.removesuffix(".py") != spec.name]
+    return list(modules.values())
+
+
+def generation_waves(modules: List[ModuleSpec]) -> List[List[ModuleSpec]]:
+    """Group modules into waves; each module only depends on modules of earlier waves."""
+    remaining = {spec.name: spec for spec in modules}
+    done, waves = set(), []
+    while remaining:
+        wave = [spec for spec in remaining.values() if set(spec.depends_on) <= done]
+        if not wave:
+            raise ModulePlanError(f"Circular dependencies between modules: {', '.join(sorted(remaining))}")
+        waves.append(wave)
+        for spec in wave:
+            done.add(spec.name)
+            del remaining[spec.name]
+    return waves
+
+
+def describe_plan(modules: List[ModuleSpec]) -> str:
+    lines = []
+    for spec in modules:
+        depends = f" (uses {', '.join(spec.depends_on)})" if spec.depends_on else ""
+        lines.append(f"- {spec.file_path}: {spec.description}{depends}")
+    return "\n".join(lines)
+
+
+def module_interface(source: str) -> str:
+    """Public signatures of a module with the first line of their docstrings."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source
+
+    def signature(node, indent=""):
+        line = f"{indent}{'async ' if isinstance(node, ast.AsyncFunctionDef) else ''}def {node.name}({ast.unparse(node.args)})"
+        if node.returns is not None:
+            line += f" -> {ast.unparse(node.returns)}"
+        doc = ast.get_docstring(node)
+        return line + (f"  # {doc.splitlines()[0]}" if doc else "")
+
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"):
+            lines.append(signature(node))
+        elif isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            doc = ast.get_docstring(node)
+            lines.append(f"class {node.name}" + (f"  # {doc.splitlines()[0]}" if doc else ""))
+            lines += [signature(child, "    ") for child in node.body
+                      if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+                      and (not child.name.startswith("_") or child.name == "__init__")]
+    return "\n".join(lines)
@@ -1,34 +1,92 @@
 import json
+import asyncio
+import threading
 import requests
-from typing import Generator
+import httpx
+from typing import Iterator
+from requests.adapters import HTTPAdapter
 
+from llm_client import LLMClient
 
-class OllamaAPI:
-    def __init__(self, model: str, base_url: str):
-        self.model = model
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def shared_session(base_url: str, pool_size: int) -> requests.Session:
+    # One keep-alive pool per server, shared by every OllamaAPI instance in the process
+    with _sessions_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[base_url] = session
+        return session
+
+
+class OllamaAPI(LLMClient):
+    provider = "ollama"
+    display_name = "Ollama"
+
+    def __init__(self, model: str, base_url: str, timeout: float = None, **client_options):
+        super().__init__(model, **client_options)
         self.base_url = base_url
+        self.timeout = timeout
+        self.session = shared_session(base_url, self.max_in_flight)
+        self._async_client = None
+        self._async_client_loop = None
 
-    def generate(self, prompt: str) -> str:
-        url = f"{self.base_url}/generate"
+    def _payload(self, prompt: str, options: dict) -> dict:
         data = {"model": self.model, "prompt": prompt, "stream": True}
+        if options:
+            data["options"] = options
+        return data
 
-        try:
-            with requests.post(url, json=data, stream=True) as response:
-                response.raise_for_status()
-                return self._process_stream(response)
-        except requests.RequestException as e:
-            raise Exception(f"Ollama API error: {str(e)}")
-
-    def _process_stream(self, response: requests.Response) -> str:
-        full_response = ""
-        for line in response.iter_lines():
-            if line:
+    def _stream(self, prompt: str, **options) -> Iterator[str]:
+        url = f"{self.base_url}/generate"
+        # Leaving the with block, including on early generator close, drops the HTTP stream
+        with self.session.post(url, json=self._payload(prompt, options), stream=True,
+                               timeout=self.timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    try:
+                        json_line = json.loads(line.decode("utf-8"))
+                        yield json_line.get("response", "")
+                    except json.JSONDecodeError:
+                        print(f"Error decoding JSON: {line.decode('utf-8')}")
+
+    def is_retriable(self, error: Exception) -> bool:
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code >= 500 or error.response.status_code == 429
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500 or error.response.status_code == 429
+        return isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError))
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.timeout)
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def _agenerate(self, prompt: str, **options) -> str:
+        client = self._get_async_client()
+        chunks = []
+        async with client.stream("POST", "/generate", json=self._payload(prompt, options)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
                 try:
-                    json_line = json.loads(line.decode("utf-8"))
-                    chunk = json_line.get("response", "")
-                    full_response += chunk
-                    print(chunk, end="", flush=True)
+                    chunks.append(json.loads(line).get("response", ""))
                 except json.JSONDecodeError:
-                    print(f"Error decoding JSON: {line.decode('utf-8')}")
-        print()  # Print a newline at the end
-        return full_response
\ No newline at end of file
+                    print(f"Error decoding JSON: {line}")
+        return "".join(chunks)
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
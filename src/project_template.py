@@ -0,0 +1,106 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import subprocess
+
+from constants import DEV_DEPENDENCIES, TESTS_INIT_CONTENT
+from dependencies import normalize_package_name
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_PROJECT_NAME = "agent-template"
+READY_MARKER = ".template_ready"
+
+
+class ProjectTemplatePool:
+    """Keeps a ready-made uv project (lockfile and populated venv) and hands out cheap copies of it."""
+
+    def __init__(self, root_dir: str, dev_dependencies=DEV_DEPENDENCIES):
+        self.root_dir = root_dir
+        self.dev_dependencies = list(dev_dependencies)
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    @property
+    def template_key(self) -> str:
+        uv_version = subprocess.run(["uv", "--version"], capture_output=True, text=True, check=True).stdout.strip()
+        material = "\n".join([uv_version] + sorted(self.dev_dependencies))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def template_dir(self) -> str:
+        return os.path.join(self.root_dir, self.template_key)
+
+    def ensure_template(self) -> str:
+        template_dir = self.template_dir
+        if os.path.exists(os.path.join(template_dir, READY_MARKER)):
+            return template_dir
+
+        logger.info(f"Building project template in {template_dir}")
+        build_root = tempfile.mkdtemp(prefix="build_", dir=self.root_dir)
+        build_dir = os.path.join(build_root, TEMPLATE_PROJECT_NAME)
+        try:
+            subprocess.run(["uv", "init", build_dir, "--no-workspace"], capture_output=True, text=True, check=True)
+            # Relocatable venvs use relative script paths, so copies keep working from any directory
+            subprocess.run(["uv", "venv", "--relocatable"], capture_output=True, text=True, check=True, cwd=build_dir)
+            subprocess.run(["uv", "add"] + self.dev_dependencies, capture_output=True, text=True, check=True,
+                           cwd=build_dir)
+
+            hello_path = os.path.join(build_dir, "hello.py")
+            if os.path.exists(hello_path):
+                os.remove(hello_path)
+            tests_dir = os.path.join(build_dir, "tests")
+            os.makedirs(tests_dir, exist_ok=True)
+            with open(os.path.join(tests_dir, '__init__.py'), 'w') as f:
+                f.write(TESTS_INIT_CONTENT)
+            with open(os.path.join(build_dir, READY_MARKER), 'w') as f:
+                f.write(self.template_key)
+
+            try:
+                os.rename(build_dir, template_dir)
+            except OSError:
+                # Another worker finished building the same template first; use theirs
+                if not os.path.exists(os.path.join(template_dir, READY_MARKER)):
+                    raise
+        finally:
+            shutil.rmtree(build_root, ignore_errors=True)
+        return template_dir
+
+    def checkout(self, dest_dir: str, project_name: str) -> None:
+        template_dir = self.ensure_template()
+        shutil.copytree(template_dir, dest_dir, copy_function=self._copy_function(template_dir),
+                        ignore=shutil.ignore_patterns(READY_MARKER), symlinks=True, dirs_exist_ok=True)
+        self._rename_project(dest_dir, project_name)
+
+    @staticmethod
+    def _copy_function(template_dir: str):
+        # Installed packages are hard-linked (uv replaces rather than edits them); everything
+        # else, including venv scripts and config, gets a private copy.
+        site_root = os.path.join(template_dir, ".venv", "lib")
+
+        def copy(src, dst):
+            if os.path.abspath(src).startswith(site_root + os.sep):
+                try:
+                    os.link(src, dst)
+                    return dst
+                except OSError:
+                    pass
+            return shutil.copy2(src, dst)
+
+        return copy
+
+    @staticmethod
+    def _rename_project(project_dir: str, project_name: str) -> None:
+        replacements = {
+            "pyproject.toml": (f'name = "{TEMPLATE_PROJECT_NAME}"', f'name = "{project_name}"'),
+            "uv.lock": (f'name = "{TEMPLATE_PROJECT_NAME}"', f'name = "{normalize_package_name(project_name)}"'),
+        }
+        for file_name, (old, new) in replacements.items():
+            path = os.path.join(project_dir, file_name)
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r') as f:
+                content = f.read()
+            with open(path, 'w') as f:
+                f.write(content.replace(old, new, 1))
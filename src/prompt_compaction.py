@@ -0,0 +1,85 @@
+import re
+from collections import OrderedDict
+from typing import List, Tuple
+
+PYLINT_MESSAGE_PATTERN = re.compile(
+    r"^(?P<path>[^:\n]+):(?P<line>\d+):(?P<column>\d+): (?P<msg_id>[A-Z]\d{4}): (?P<message>.*?) \((?P<symbol>[\w-]+)\)$",
+    re.MULTILINE
+)
+# Matches "name ... 12" rows from complexipy's table or plain-text output
+COMPLEXIPY_ROW_PATTERN = re.compile(r"(?P<name>[A-Za-z_][\w.]*)\W+(?P<complexity>\d+)\W*(?:PASSED|FAILED)?\W*$")
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Fatal and error messages matter most, conventions least
+PYLINT_SEVERITY = {"F": 0, "E": 1, "W": 2, "R": 3, "C": 4, "I": 5}
+
+
+def count_tokens(text: str) -> int:
+    # Word/punctuation split tracks BPE token counts closely enough for budgeting and logging
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def format_line_spans(lines: List[int]) -> str:
+    spans = []
+    for line in sorted(set(lines)):
+        if spans and line == spans[-1][1] + 1:
+            spans[-1][1] = line
+        else:
+            spans.append([line, line])
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in spans)
+
+
+def compact_pylint_output(pylint_output: str) -> List[str]:
+    grouped = OrderedDict()
+    for match in PYLINT_MESSAGE_PATTERN.finditer(pylint_output):
+        key = (match.group("msg_id"), match.group("symbol"), match.group("message"))
+        grouped.setdefault(key, []).append(int(match.group("line")))
+
+    if not grouped:
+        return [line.strip() for line in pylint_output.splitlines()
+                if line.strip() and not line.startswith(("*", "-"))]
+
+    ranked = sorted(grouped.items(), key=lambda item: (PYLINT_SEVERITY.get(item[0][0][0], 9), -len(item[1])))
+    issues = []
+    for (msg_id, symbol, message), lines in ranked:
+        count = f" x{len(lines)}" if len(lines) > 1 else ""
+        issues.append(f"{msg_id} {symbol}{count} (lines {format_line_spans(lines)}): {message}")
+    return issues
+
+
+def compact_complexipy_output(complexipy_output: str, threshold: int = 0) -> List[str]:
+    functions = OrderedDict()
+    for line in complexipy_output.splitlines():
+        if "Total Cognitive Complexity" in line or line.strip().startswith(("─", "━", "┏", "┗", "└", "┌")):
+            continue
+        cells = [cell.strip() for cell in re.split(r"[│┃|]", line) if cell.strip()]
+        text = " ".join(cells) if cells else line.strip()
+        match = COMPLEXIPY_ROW_PATTERN.search(text)
+        if match and match.group("name") not in ("Path", "File", "Function"):
+            functions[match.group("name")] = max(functions.get(match.group("name"), 0),
+                                                 int(match.group("complexity")))
+
+    ranked = sorted(functions.items(), key=lambda item: -item[1])
+    return [f"{name}: cognitive complexity {complexity}" + (" (over threshold)" if complexity > threshold else "")
+            for name, complexity in ranked if complexity > 0]
+
+
+def truncate_to_budget(issues: List[str], budget: int) -> Tuple[str, int]:
+    kept, used = [], 0
+    for issue in issues:
+        cost = count_tokens(issue)
+        if kept and used + cost > budget:
+            kept.append(f"... {len(issues) - len(kept)} more issues omitted")
+            break
+        kept.append(issue)
+        used += cost
+    return "\n".join(f"- {issue}" for issue in kept), used
+
+
+def compact_quality_outputs(pylint_output: str, complexipy_output: str, budget: int,
+                            complexipy_threshold: int = 0) -> Tuple[str, str]:
+    """Dedupe, rank and trim tool outputs so both fit in roughly ``budget`` tokens together."""
+    complexity_issues = compact_complexipy_output(complexipy_output, complexipy_threshold)
+    complexity_text, used = truncate_to_budget(complexity_issues, budget // 4)
+    pylint_text, _ = truncate_to_budget(compact_pylint_output(pylint_output), budget - used)
+    return pylint_text or "No pylint issues reported.", complexity_text or "No complex functions reported."
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import tempfile
+import threading
+import subprocess
+from dataclasses import dataclass, replace
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Runs in the child: apply the limits, then exec the real command, so no Python code runs between fork and exec
+LIMITS_LAUNCHER = """
+import os, sys, resource
+cpu, memory = int(sys.argv[1]), int(sys.argv[2])
+if cpu > 0:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 5))
+if memory > 0:
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    except (ValueError, OSError):
+        pass
+os.execvp(sys.argv[3], sys.argv[3:])
+"""
+
+
+@dataclass(frozen=True)
+class SandboxLimits:
+    wall_time: Optional[float] = 300
+    cpu_time: Optional[int] = None
+    memory_mb: Optional[int] = None
+
+
+@dataclass
+class SandboxResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+    port: int
+    timed_out: bool = False
+
+
+def allocate_port(host: str = "127.0.0.1") -> int:
+    # Binding port 0 lets the OS pick a free port, so concurrent runs never collide on a fixed one
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def _kill_group(process: subprocess.Popen) -> None:
+    if os.name == "posix":
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    elif process.poll() is None:
+        process.kill()
+
+
+def run_sandboxed(command: List[str], cwd: str, limits: SandboxLimits, env: Dict[str, str] = None) -> SandboxResult:
+    """Run ``command`` in its own process group under ``limits`` with a free port in $PORT.
+
+    Whatever the command leaves behind in its process group (servers, pytest workers) is killed
+    when it returns, times out or the caller is interrupted.
+    """
+    port = allocate_port()
+    child_env = dict(os.environ, **(env or {}), PORT=str(port))
+    if resource is not None and (limits.cpu_time or limits.memory_mb):
+        command = [sys.executable, "-c", LIMITS_LAUNCHER, str(limits.cpu_time or 0),
+                   str((limits.memory_mb or 0) * 1024 * 1024)] + list(command)
+    if os.name == "posix":
+        group_options = dict(start_new_session=True)
+    else:
+        group_options = dict(creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+
+    start = time.perf_counter()
+    # Output goes to files rather than pipes: a server the command leaves running would hold a pipe open,
+    # and waiting for EOF would then block until the wall-time limit even though the command has exited
+    with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(command, cwd=cwd, env=child_env, stdout=stdout_file, stderr=stderr_file,
+                                   **group_options)
+        timed_out = False
+        try:
+            process.wait(timeout=limits.wall_time)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            logger.warning(f"Killed {' '.join(command[-3:])} in {cwd} after {limits.wall_time}s")
+        finally:
+            _kill_group(process)
+            process.wait()
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+        stdout = stdout_file.read().decode("utf-8", errors="replace")
+        stderr = stderr_file.read().decode("utf-8", errors="replace")
+    if timed_out:
+        stderr += f"\nSandbox: killed after exceeding the {limits.wall_time}s wall-time limit\n"
+    return SandboxResult(process.returncode, stdout, stderr, time.perf_counter() - start, port, timed_out)
+
+
+class SandboxPool:
+    """A fixed number of sandbox slots shared by every agent in the process.
+
+    Each slot is a reusable worker thread supervising one sandboxed process at a time, so
+    concurrent agents queue for a slot instead of oversubscribing the machine.
+    """
+
+    def __init__(self, size: int, limits: SandboxLimits):
+        self.limits = limits
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sandbox")
+
+    def submit(self, command: List[str], cwd: str, env: Dict[str, str] = None,
+               limits: SandboxLimits = None) -> Future:
+        return self.executor.submit(run_sandboxed, command, cwd, limits or self.limits, env)
+
+    def run(self, command: List[str], cwd: str, env: Dict[str, str] = None, **limit_overrides) -> SandboxResult:
+        limits = replace(self.limits, **limit_overrides) if limit_overrides else None
+        return self.submit(command, cwd, env, limits).result()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def shared_pool(size: int, limits: SandboxLimits) -> SandboxPool:
+    with _pools_lock:
+        pool = _pools.get((size, limits))
+        if pool is None:
+            pool = _pools[(size, limits)] = SandboxPool(size, limits)
+        return pool
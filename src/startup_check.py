@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+
+import click
+
+from constants import CONFIG_PATH
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+AGENT_SNIPPET = """
+import sys
+sys.path.insert(0, {src_dir!r})
+from coder_ai_agent import CoderAIAgent
+CoderAIAgent("startup check", project_name="startup_check",
+             config_overrides={{"checkpoint_dir": None, "llm_cache_enabled": False}})
+"""
+
+
+def best_wall_time(command: list, runs: int, cwd: str) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, capture_output=True, text=True, cwd=cwd)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise click.ClickException(f"{' '.join(command[:3])} failed:\n{result.stderr}")
+    return min(timings)
+
+
+def slowest_imports(module: str, count: int = 8) -> list:
+    """Largest cumulative import times (in ms) reported by ``python -X importtime``."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=SRC_DIR)
+    imports = []
+    for line in result.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]) / 1000, parts[2].strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+@click.command()
+@click.option("--runs", default=3, type=int, help="Measure each command this many times and keep the best")
+@click.option("--help-budget", type=float, help="Seconds allowed for `main.py --help` (default from config.json)")
+@click.option("--agent-budget", type=float, help="Seconds allowed for constructing an agent (default from config.json)")
+def startup_check(runs: int, help_budget: float = None, agent_budget: float = None):
+    """
+    Fail if CLI startup or agent construction exceeds its time budget, listing the slowest imports.
+    """
+    with open(CONFIG_PATH, "r") as f:
+        config = json.load(f)
+    checks = [
+        ("main.py --help", [sys.executable, os.path.join(SRC_DIR, "main.py"), "--help"], "main",
+         help_budget or config["startup_help_budget"]),
+        ("agent construction", [sys.executable, "-c", AGENT_SNIPPET.format(src_dir=SRC_DIR)], "coder_ai_agent",
+         agent_budget or config["startup_agent_budget"]),
+    ]
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="startup_check_") as work_dir:
+        for name, command, module, budget in checks:
+            seconds = best_wall_time(command, runs, work_dir)
+            within = seconds <= budget
+            print(f"{name}: {seconds:.3f}s (budget {budget:.3f}s) {'OK' if within else 'OVER BUDGET'}")
+            if not within:
+                failed = True
+                for milliseconds, imported in slowest_imports(module):
+                    print(f"    {milliseconds:8.1f} ms  {imported}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    startup_check()
@@ -0,0 +1,65 @@
+import os
+import json
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import List, Optional
+
+from constants import (
+    PYTEST_CMD, PYTEST_REPORT_DIR, PYTEST_JUNIT_REPORT, PYTEST_COVERAGE_REPORT, PYTEST_PARALLEL_ARGS
+)
+
+
+@dataclass
+class TestReport:
+    tests: int = 0
+    failures: int = 0
+    errors: int = 0
+    skipped: int = 0
+    coverage: Optional[float] = None
+
+    @property
+    def passed(self) -> bool:
+        return self.failures == 0 and self.errors == 0
+
+
+def build_pytest_command(cwd: str, parallel: bool = False) -> List[str]:
+    command = PYTEST_CMD + [
+        f"--cov={cwd}",
+        f"--junitxml={PYTEST_JUNIT_REPORT}",
+        f"--cov-report=json:{PYTEST_COVERAGE_REPORT}",
+    ]
+    if parallel:
+        command += PYTEST_PARALLEL_ARGS
+    return command
+
+
+def prepare_report_dir(cwd: str) -> None:
+    report_dir = os.path.join(cwd, PYTEST_REPORT_DIR)
+    os.makedirs(report_dir, exist_ok=True)
+    for name in (PYTEST_JUNIT_REPORT, PYTEST_COVERAGE_REPORT):
+        try:
+            os.remove(os.path.join(cwd, name))
+        except OSError:
+            pass
+
+
+def read_test_reports(cwd: str) -> Optional[TestReport]:
+    junit_path = os.path.join(cwd, PYTEST_JUNIT_REPORT)
+    if not os.path.exists(junit_path):
+        return None
+
+    report = TestReport()
+    root = ET.parse(junit_path).getroot()
+    suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+    for suite in suites:
+        report.tests += int(suite.get("tests", 0))
+        report.failures += int(suite.get("failures", 0))
+        report.errors += int(suite.get("errors", 0))
+        report.skipped += int(suite.get("skipped", 0))
+
+    coverage_path = os.path.join(cwd, PYTEST_COVERAGE_REPORT)
+    if os.path.exists(coverage_path):
+        with open(coverage_path, "r") as f:
+            coverage = json.load(f)
+        report.coverage = coverage.get("totals", {}).get("percent_covered")
+    return report
@@ -0,0 +1,82 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    """Collects timed spans for one agent run and exports them as a Chrome trace."""
+
+    def __init__(self):
+        self.spans = []
+        self.origin = time.perf_counter()
+        self.wall_origin = time.time()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start = time.perf_counter()
+        try:
+            # Callers may add attributes (token counts, outcomes) while the span is open
+            yield attrs
+        finally:
+            self.add(name, start, time.perf_counter() - start, **attrs)
+
+    def add(self, name: str, start: float, duration: float, **attrs) -> None:
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start": start - self.origin,
+                "duration": duration,
+                "thread": threading.get_ident(),
+                "attrs": attrs,
+            })
+
+    def summary(self) -> dict:
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span["name"], {"count": 0, "total": 0.0, "max": 0.0})
+            stage["count"] += 1
+            stage["total"] += span["duration"]
+            stage["max"] = max(stage["max"], span["duration"])
+            for key in ("prompt_tokens", "completion_tokens"):
+                if key in span["attrs"]:
+                    stage[key] = stage.get(key, 0) + span["attrs"][key]
+        return stages
+
+    def log_summary(self) -> None:
+        stages = sorted(self.summary().items(), key=lambda item: -item[1]["total"])
+        lines = []
+        for name, stage in stages:
+            line = f"  {name:<32} {stage['total']:9.2f}s  x{stage['count']:<4} max {stage['max']:.2f}s"
+            if "completion_tokens" in stage:
+                line += f"  tokens in/out {stage.get('prompt_tokens', 0)}/{stage['completion_tokens']}"
+            lines.append(line)
+        logger.info("Run trace summary:\n%s", "\n".join(lines))
+
+    def export_chrome_trace(self, path: str) -> None:
+        with self._lock:
+            spans = list(self.spans)
+        events = [
+            {
+                "name": span["name"],
+                "cat": span["name"].split(".")[0],
+                "ph": "X",
+                "ts": (self.wall_origin + span["start"]) * 1e6,
+                "dur": span["duration"] * 1e6,
+                "pid": os.getpid(),
+                "tid": span["thread"],
+                "args": span["attrs"],
+            }
+            for span in spans
+        ]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "summary": self.summary()}, f, default=str)
+        logger.info(f"Run trace written to {path}")
@@ -0,0 +1,238 @@
+import os
+import re
+import ast
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+from analysis_store import AnalysisStore, python_sources
+from constants import PYTEST_QUICK_CMD
+from file_utils import validate_file_content
+from sandbox import SandboxLimits, SandboxPool, SandboxResult, run_sandboxed
+
+VERDICT_PATTERN = re.compile(r"\b(INVALID|VALID)\b")
+FAILURE_PATTERN = re.compile(r"^(?:FAILED|ERROR) (\S+)", re.MULTILINE)
+
+
+def parse_verdict(response: str) -> Optional[bool]:
+    """Read a VALID/INVALID answer; None when the response contains neither word."""
+    match = VERDICT_PATTERN.search(response.upper())
+    if match is None:
+        return None
+    return match.group(1) == "VALID"
+
+
+def quick_test_failures(result: SandboxResult) -> List[str]:
+    """Node ids from pytest's short summary; a failing run without one is reported by its exit status."""
+    if result.returncode == 0:
+        return []
+    return FAILURE_PATTERN.findall(result.stdout) or [f"pytest exit status {result.returncode}"]
+
+
+@contextmanager
+def scratch_project(project_dir: str, file_contents: Dict[str, str], prefix: str = "scratch_",
+                    share_venv: bool = True):
+    """Copy of the project with ``file_contents`` written over it.
+
+    The copy shares the project's .venv unless ``share_venv`` is False, in which case uv builds
+    the copy its own environment on first use, so installing into it leaves the project's untouched.
+    """
+    scratch_dir = tempfile.mkdtemp(prefix=prefix)
+    try:
+        shutil.copytree(project_dir, scratch_dir, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(".venv", "__pycache__", ".pytest_cache"))
+        venv_dir = os.path.join(project_dir, ".venv")
+        if share_venv and os.path.isdir(venv_dir):
+            os.symlink(venv_dir, os.path.join(scratch_dir, ".venv"), target_is_directory=True)
+
+        for file_path, content in file_contents.items():
+            full_path = os.path.join(scratch_dir, file_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            content = validate_file_content(full_path, content)
+            if content is None:
+                raise ValueError(f"Invalid content for file: {file_path}")
+            with open(full_path, "w") as f:
+                f.write(content)
+        yield scratch_dir
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def top_level_names(tree: ast.Module) -> Optional[Set[str]]:
+    """Names a module defines at top level, or None when they cannot be known statically."""
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            if node.name == "__getattr__":
+                return None
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                names.update(n.id for n in ast.walk(target) if isinstance(n, ast.Name))
+        elif isinstance(node, (ast.AnnAssign, ast.AugAssign)) and isinstance(node.target, ast.Name):
+            names.add(node.target.id)
+        elif isinstance(node, ast.Import):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if any(alias.name == "*" for alias in node.names):
+                return None
+            names.update(alias.asname or alias.name for alias in node.names)
+    return names
+
+
+def referenced_names(tree: ast.Module, modules: Set[str]) -> Dict[str, Set[str]]:
+    """Attributes a test module uses from each project module, via ``import m`` / ``from m import x``."""
+    aliases, used = {}, {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name in modules:
+                    aliases[alias.asname or alias.name] = alias.name
+                    used.setdefault(alias.name, set())
+        elif isinstance(node, ast.ImportFrom) and node.module in modules and node.level == 0:
+            used.setdefault(node.module, set()).update(alias.name for alias in node.names if alias.name != "*")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in aliases:
+            used[aliases[node.value.id]].add(node.attr)
+    return used
+
+
+class LocalValidator:
+    """Cheap checks that settle most proposed changes without asking the LLM.
+
+    ``validate`` returns (True, reason) or (False, reason) when the local signals are conclusive,
+    and (None, reason) when only a judge can tell.
+    """
+
+    def __init__(self, project_dir: str, quick_tests: bool = True, test_timeout: float = 60,
+                 sandbox: SandboxPool = None, store: AnalysisStore = None):
+        self.project_dir = project_dir
+        self.quick_tests = quick_tests
+        self.test_timeout = test_timeout
+        self.sandbox = sandbox
+        self.store = store
+
+    def _read_project_file(self, file_path: str) -> Optional[str]:
+        full_path = os.path.join(self.project_dir, file_path)
+        if not os.path.exists(full_path):
+            return None
+        with open(full_path, "r") as f:
+            return f.read()
+
+    def _project_sources(self, file_contents: Dict[str, str]) -> Dict[str, str]:
+        sources = {}
+        for root, dirs, files in os.walk(self.project_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__pycache__"]
+            for name in files:
+                if name.endswith(".py"):
+                    path = os.path.relpath(os.path.join(root, name), self.project_dir).replace(os.sep, "/")
+                    sources[path] = self._read_project_file(path)
+        sources.update(file_contents)
+        return sources
+
+    def validate(self, file_contents: Dict[str, str]) -> Tuple[Optional[bool], str]:
+        if not file_contents:
+            return False, "the response contains no file changes"
+
+        trees = {}
+        for file_path, content in file_contents.items():
+            if not file_path.endswith(".py"):
+                continue
+            try:
+                trees[file_path] = ast.parse(content)
+            except SyntaxError as e:
+                return False, f"{file_path} does not parse: {e}"
+
+        missing = self.missing_test_references(file_contents, trees)
+        if missing:
+            return False, missing
+
+        removed = self.removed_public_names(trees)
+        if self.quick_tests:
+            failures, reason = self.run_quick_tests(file_contents)
+            if failures != []:
+                # Failing tests may be the very thing a test-only fix addresses, so only that is left to the judge
+                if all(file_path.startswith("tests/") for file_path in file_contents):
+                    return None, reason
+                baseline = self.baseline_failures() if failures else None
+                if not baseline or set(failures) - set(baseline):
+                    return False, reason
+                # The suite was already red before the change and the change adds no failures of its own
+                return None, f"{reason}, as it did before the change"
+        else:
+            reason = "the code parses and the tests' imports still resolve"
+
+        if removed:
+            return None, f"public names removed: {', '.join(removed)}"
+        return True, reason
+
+    def missing_test_references(self, file_contents: Dict[str, str], trees: Dict[str, ast.Module]) -> Optional[str]:
+        sources = self._project_sources(file_contents)
+        modules = {path[:-3]: path for path in sources if "/" not in path and path.endswith(".py")}
+        for test_path, source in sources.items():
+            if not test_path.startswith("tests/"):
+                continue
+            try:
+                test_tree = trees.get(test_path) or ast.parse(source)
+                for module, names in referenced_names(test_tree, set(modules)).items():
+                    module_path = modules[module]
+                    defined = top_level_names(trees.get(module_path) or ast.parse(sources[module_path]))
+                    missing = sorted(names - defined) if defined is not None else []
+                    if missing:
+                        return f"{test_path} uses {', '.join(missing)} which {module_path} no longer defines"
+            except SyntaxError:
+                continue
+        return None
+
+    def removed_public_names(self, trees: Dict[str, ast.Module]) -> list:
+        removed = []
+        for file_path, tree in trees.items():
+            previous = self._read_project_file(file_path)
+            if previous is None or file_path.startswith("tests/"):
+                continue
+            try:
+                before, after = top_level_names(ast.parse(previous)), top_level_names(tree)
+            except SyntaxError:
+                continue
+            if before is not None and after is not None:
+                removed += [f"{file_path}:{name}" for name in sorted(before - after) if not name.startswith("_")]
+        return removed
+
+    def _run_quick_suite(self, file_contents: Dict[str, str]) -> SandboxResult:
+        with scratch_project(self.project_dir, file_contents, prefix="validate_") as scratch_dir:
+            if self.sandbox is not None:
+                return self.sandbox.run(PYTEST_QUICK_CMD, scratch_dir, wall_time=self.test_timeout)
+            return run_sandboxed(PYTEST_QUICK_CMD, scratch_dir, SandboxLimits(wall_time=self.test_timeout))
+
+    def run_quick_tests(self, file_contents: Dict[str, str]) -> Tuple[Optional[List[str]], str]:
+        """The failing tests with ``file_contents`` applied (empty when the suite passes), or None when it could not run."""
+        try:
+            result = self._run_quick_suite(file_contents)
+        except (OSError, ValueError) as e:
+            return None, f"the tests could not be run: {e}"
+        if result.timed_out:
+            return None, f"the tests did not finish within {self.test_timeout}s"
+        failures = quick_test_failures(result)
+        if not failures:
+            return failures, "the test suite passes with the change applied"
+        return failures, f"the test suite fails with the change applied: {', '.join(failures)}"
+
+    def baseline_failures(self) -> Optional[List[str]]:
+        """The failing tests of the unchanged project, computed once per project state."""
+        file_paths = python_sources(self.project_dir) + ["pyproject.toml"]
+        fingerprint = AnalysisStore.fingerprint(self.project_dir, file_paths)
+        if self.store is not None:
+            cached = self.store.get("quick_tests", fingerprint)
+            if cached is not None:
+                return cached
+        try:
+            result = self._run_quick_suite({})
+        except (OSError, ValueError):
+            return None
+        if result.timed_out:
+            return None
+        failures = quick_test_failures(result)
+        if self.store is not None:
+            self.store.put("quick_tests", fingerprint, failures)
+        return failures